@@ -0,0 +1,329 @@
+"""Local stand-in for the Jira REST endpoints used by the tool. Serves `SyntheticJira` data."""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import urllib.request
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from benchmarks.synthetic import SyntheticJira
+
+CLAUSE = re.compile(r"^\(?(\w+)\s*(=|!=|>=|<=|>|<|~|in|not in)\s*(.+?)\)?$", re.IGNORECASE)
+
+
+def _values(raw: str):
+    raw = raw.strip().strip("()")
+    return [value.strip().strip("'\"").lower() for value in raw.split(",") if value.strip()]
+
+
+def _field_values(issue: dict, field: str):
+    fields = issue["fields"]
+    if field == "project":
+        return [issue["key"].split("-")[0].lower()]
+    if field in ("issue", "key", "issuekey"):
+        return [issue["key"].lower()]
+    if field == "sprint":
+        return [str(sprint["id"]) for sprint in fields.get("customfield_10016") or []]
+    if field in ("type", "issuetype"):
+        return [fields["issuetype"]["name"].lower()]
+    if field == "priority":
+        return [fields["priority"]["name"].lower()]
+    if field == "statuscategory":
+        return [{"new": "to do", "indeterminate": "in progress", "done": "done"}[fields["status"]["statusCategory"]["key"]]]
+    if field == "labels":
+        return [label.lower() for label in fields.get("labels") or []]
+    if field == "summary":
+        return [fields["summary"].lower()]
+    if field in ("updated", "resolved", "created"):
+        value = fields.get({"resolved": "resolutiondate"}.get(field, field))
+        return [] if value is None else [value[:16].replace("T", " ")]
+    raise ValueError(f"Unsupported JQL field: {field}")
+
+
+def jql_filter(jql: str):
+    """Supports the `and`-joined subset of JQL the tool sends, clauses may be `or`-joined in parentheses."""
+    jql = re.split(r"\s+order\s+by\s+", jql, flags=re.IGNORECASE)[0]
+    clauses = []
+    for clause in re.split(r"\s+and\s+", jql.strip(), flags=re.IGNORECASE):
+        alternatives = []
+        for alternative in re.split(r"\s+or\s+", clause.strip(), flags=re.IGNORECASE):
+            match = CLAUSE.match(alternative.strip())
+            if match is None:
+                raise ValueError(f"Unsupported JQL clause: {clause}")
+            field, operator, raw = match.group(1).lower(), match.group(2).lower(), match.group(3)
+            alternatives.append((field, operator, _values(raw)))
+        clauses.append(alternatives)
+
+    def clause_matches(issue: dict, field: str, operator: str, values: list):
+        actual = _field_values(issue, field)
+        if operator in ("=", "in"):
+            return any(value in actual for value in values)
+        if operator in ("!=", "not in"):
+            return not any(value in actual for value in values)
+        if operator == "~":
+            # text search matches whole words
+            return any(re.search(rf"\b{re.escape(values[0])}\b", value) is not None for value in actual)
+        if not actual:
+            return False
+        return {">=": actual[0] >= values[0], "<=": actual[0] <= values[0],
+                ">": actual[0] > values[0], "<": actual[0] < values[0]}[operator]
+
+    def matches(issue: dict):
+        return all(any(clause_matches(issue, *alternative) for alternative in alternatives)
+                   for alternatives in clauses)
+    return matches
+
+
+def _sort_value(issue: dict, field: str):
+    if field in ("issue", "key", "issuekey"):
+        # keys are ordered by the issue number, not as strings
+        return issue["key"].split("-")[0], int(issue["key"].split("-")[1])
+    if field in ("updated", "resolved", "created"):
+        return issue["fields"].get({"resolved": "resolutiondate"}.get(field, field)) or ""
+    return _field_values(issue, field)[:1]
+
+
+def jql_order(jql: str):
+    """Sorts issues by `order by <field> [asc|desc], ...` of the JQL, if there is one."""
+    match = re.search(r"\s+order\s+by\s+(.+?)\s*$", jql, flags=re.IGNORECASE)
+    if match is None:
+        return lambda issues: issues
+
+    def order(issues: list):
+        # sorted by the last field first, sorting is stable
+        for clause in reversed(match.group(1).split(",")):
+            field, *direction = clause.split()
+            descending = [value.lower() for value in direction] == ["desc"]
+            issues = sorted(issues, key=lambda issue: _sort_value(issue, field.lower()), reverse=descending)
+        return issues
+    return order
+
+
+class MockJiraServer:
+    """`latency` seconds are added to every response, `page_size` caps `maxResults` like Jira Cloud does,
+    `changelog_page_size` caps histories returned with a search like Jira does for long changelogs.
+    `throttle_rate` of requests get 429 with Retry-After of `retry_after` seconds.
+    Requests, throttled requests and sent bytes are counted, `/mock/stats` returns the counters.
+
+    POST `/mock/issues/<key>/transition` with `{"status": ..., "time": ...}` changes the issue like a user does,
+    and a Jira `jira:issue_updated` webhook is sent to `webhook` url if it's passed."""
+
+    def __init__(self, jira, latency=0.0, page_size=100, changelog_page_size=100, throttle_rate=0.0, retry_after=1,
+                 host="127.0.0.1", port=0, webhook=None):
+        self.jira = jira
+        self.webhook = webhook
+        self.latency = latency
+        self.page_size = page_size
+        self.changelog_page_size = changelog_page_size
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.random = random.Random(0)
+        self.request_count = 0
+        self.throttled_count = 0
+        self.bytes_sent = 0
+        self._found = {}
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def unknown_keys(self, jql: str):
+        """Keys in `key in (...)` / `key = ...` clauses of the JQL which don't exist."""
+        unknown = []
+        for match in re.finditer(r"\b(?:key|issuekey|issue)\s*(?:=|in)\s*(\([^)]*\)|\S+)", jql, flags=re.IGNORECASE):
+            unknown += [key.upper() for key in _values(match.group(1)) if key.upper() not in self.jira.issues]
+        return unknown
+
+    def search(self, query: dict):
+        jql = query.get("jql", [""])[0]
+        unknown = self.unknown_keys(jql)
+        if unknown and query.get("validateQuery", ["strict"])[0] not in ("warn", "none"):
+            # the same as Jira does with the default validation
+            raise ValueError(f"An issue with key '{unknown[0]}' does not exist for field 'key'.")
+        start_at = int(query.get("startAt", ["0"])[0])
+        max_results = min(int(query.get("maxResults", ["50"])[0]), self.page_size)
+        # pages of one search come with the same JQL, so issues are filtered once
+        if jql not in self._found:
+            matches = jql_filter(jql)
+            self._found[jql] = jql_order(jql)([issue for issue in self.jira.issues.values() if matches(issue)])
+        found = self._found[jql]
+        fields = query.get("fields", ["*all"])[0].split(",")
+        expand = query.get("expand", [""])[0]
+        page = []
+        for issue in found[start_at:start_at + max_results]:
+            issue_json = {"id": issue["id"], "key": issue["key"], "fields": issue["fields"]}
+            if fields != ["*all"] and fields != ["*navigable"]:
+                issue_json["fields"] = {name: value for name, value in issue["fields"].items() if name in fields}
+            if "changelog" in expand:
+                changelog = issue["changelog"]
+                histories = changelog["histories"][:self.changelog_page_size]
+                issue_json["changelog"] = {"startAt": 0, "maxResults": len(histories),
+                                           "total": changelog["total"], "histories": histories}
+            page.append(issue_json)
+        result = {"startAt": start_at, "maxResults": max_results, "total": len(found), "issues": page}
+        if unknown:
+            result["warningMessages"] = [f"The issue key '{key}' for field 'key' is invalid." for key in unknown]
+        return result
+
+    def changelog(self, key: str, query: dict):
+        histories = list(reversed(self.jira.issues[key]["changelog"]["histories"]))  # oldest first
+        start_at = int(query.get("startAt", ["0"])[0])
+        max_results = min(int(query.get("maxResults", ["100"])[0]), self.changelog_page_size)
+        values = histories[start_at:start_at + max_results]
+        return {"startAt": start_at, "maxResults": max_results, "total": len(histories),
+                "isLast": start_at + max_results >= len(histories), "values": values}
+
+    def board_sprints(self, board_id: int, query: dict):
+        sprints = [sprint for sprint in self.jira.sprints.values() if sprint["originBoardId"] == board_id]
+        states = query.get("state", [""])[0]
+        if states:
+            sprints = [sprint for sprint in sprints if sprint["state"] in states.split(",")]
+        start_at = int(query.get("startAt", ["0"])[0])
+        max_results = int(query.get("maxResults", ["50"])[0])
+        values = sprints[start_at:start_at + max_results]
+        return {"startAt": start_at, "maxResults": max_results,
+                "isLast": start_at + max_results >= len(sprints), "values": values}
+
+    def route(self, path: str, query: dict):
+        if path == "/rest/api/2/search":
+            return 200, self.search(query)
+        match = re.match(r"^/rest/api/2/issue/([\w-]+)/changelog$", path)
+        if match:
+            return 200, self.changelog(match.group(1), query)
+        match = re.match(r"^/rest/agile/1.0/sprint/(\d+)$", path)
+        if match and int(match.group(1)) in self.jira.sprints:
+            return 200, self.jira.sprints[int(match.group(1))]
+        match = re.match(r"^/rest/agile/1.0/board/(\d+)/sprint$", path)
+        if match:
+            return 200, self.board_sprints(int(match.group(1)), query)
+        if path == "/rest/greenhopper/1.0/rapid/charts/scopechangeburndownchart":
+            return 200, self.jira.scope_change_chart(int(query["sprintId"][0]))
+        return 404, {"errorMessages": [f"Not found: {path}"]}
+
+    def transition(self, key: str, body: dict):
+        moment = None if body.get("time") is None else datetime.fromisoformat(body["time"])
+        with self._lock:
+            history = self.jira.transition(key, body["status"], moment)
+            # search results are cached by JQL
+            self._found.clear()
+        issue = self.jira.issues[key]
+        payload = {"timestamp": int(time.time() * 1000), "webhookEvent": "jira:issue_updated",
+                   "issue_event_type_name": "issue_generic",
+                   "issue": {"id": issue["id"], "key": key, "fields": issue["fields"]},
+                   "changelog": {"id": history["id"], "items": history["items"]}}
+        if self.webhook is not None:
+            # sent before the response, so the receiver has handled the change when the transition returns
+            request = urllib.request.Request(self.webhook, data=json.dumps(payload).encode(), method="POST",
+                                             headers={"Content-Type": "application/json"})
+            with urllib.request.urlopen(request) as response:
+                response.read()
+        return payload
+
+    def stats(self):
+        return {"requests": self.request_count, "throttled": self.throttled_count, "bytes": self.bytes_sent}
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                if parsed.path == "/mock/stats":
+                    return self._send(200, server.stats())
+                if server.latency:
+                    time.sleep(server.latency)
+                with server._lock:
+                    throttled = server.random.random() < server.throttle_rate
+                    server.request_count += 1
+                    server.throttled_count += throttled
+                if throttled:
+                    self._send(429, {"errorMessages": ["Rate limit exceeded"]}, {"Retry-After": str(server.retry_after)})
+                    return
+                try:
+                    status, payload = server.route(parsed.path, parse_qs(parsed.query))
+                except ValueError as e:
+                    status, payload = 400, {"errorMessages": [str(e)]}
+                data = self._send(status, payload)
+                with server._lock:
+                    server.bytes_sent += len(data)
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                match = re.match(r"^/mock/issues/([\w-]+)/transition$", urlparse(self.path).path)
+                if match is None or match.group(1) not in server.jira.issues:
+                    return self._send(404, {"errorMessages": [f"Not found: {self.path}"]})
+                try:
+                    self._send(200, server.transition(match.group(1), body))
+                except (KeyError, ValueError) as e:
+                    self._send(400, {"errorMessages": [repr(e)]})
+
+            def _send(self, status: int, payload, headers=None):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+                return data
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def serve(issue_count: int, port=0, latency=0.0, page_size=100, changelog_page_size=100, throttle_rate=0.0,
+          ready=None, webhook=None):
+    """Generates the data and serves it until the process is stopped. The url is sent to `ready` queue if passed."""
+    server = MockJiraServer(SyntheticJira(issue_count=issue_count), latency=latency, page_size=page_size,
+                            changelog_page_size=changelog_page_size, throttle_rate=throttle_rate, port=port,
+                            webhook=webhook).start()
+    if ready is not None:
+        ready.put(server.url)
+    server.thread.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for Jira with synthetic data. ",
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("--issues", type=int, default=1000, help="Number of generated issues")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on 127.0.0.1")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--page-size", type=int, default=100, help="Max issues in one search page")
+    parser.add_argument("--changelog-page-size", type=int, default=100,
+                        help="Max changelog histories returned with an issue")
+    parser.add_argument("--throttle-rate", type=float, default=0.0,
+                        help="Share of requests answered with 429 Too Many Requests")
+    parser.add_argument("--webhook", type=str, help="Url to send Jira webhooks to when issues are changed")
+    args = parser.parse_args()
+
+    print(f"Serving {args.issues} issues at http://127.0.0.1:{args.port}", flush=True)
+    serve(args.issues, args.port, args.latency, args.page_size, args.changelog_page_size, args.throttle_rate,
+          webhook=args.webhook)
@@ -0,0 +1,156 @@
+"""Sprint metrics benchmark against the local mock Jira with synthetic data:
+time, throughput, peak memory and Jira requests per section for several project sizes."""
+import argparse
+import io
+import json
+import multiprocessing
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+import requests
+import pandas as pd
+import my_jira
+import sprint_metrics
+from metrics import *
+from benchmarks.mock_server import serve
+
+PROJECT = "BENCH"
+BENCHMARK_SPRINT = 105
+DEFAULT_SIZES = "1000,10000,100000"
+
+
+def project_issues(context: dict):
+    return len(get_jira_issues_by_jql(f"project = {PROJECT}"))
+
+
+def sprint_snapshot(context: dict):
+    context["snapshot"] = SprintSnapshot(PROJECT, JiraSprint(BENCHMARK_SPRINT))
+    return len(context["snapshot"].sprint_issues)
+
+
+def report_section(section: str):
+    """Computes the report section of sprint_metrics for the snapshot and renders it as text,
+    the report itself is dropped."""
+    compute, render, _ = sprint_metrics.SECTIONS[section]
+
+    def run(context: dict):
+        with redirect_stdout(io.StringIO()):
+            render(context["snapshot"], compute(context["snapshot"]))
+        return len(context["snapshot"].sprint_issues)
+    return run
+
+
+def defect_dynamics(context: dict):
+    compute, render, _ = sprint_metrics.SECTIONS["defects"]
+    with redirect_stdout(io.StringIO()):
+        render(None, compute(PROJECT))
+    return 0
+
+
+# in the order of the report, the snapshot is taken before the sections which use it
+SECTIONS = {
+    "project issues": project_issues,
+    "sprint snapshot": sprint_snapshot,
+    "sprint goals completion": report_section("goals"),
+    "development time": report_section("development"),
+    "team velocity": report_section("velocity"),
+    "unplanned work": report_section("unplanned"),
+    "focus structure": report_section("focus"),
+    "defect dynamics": defect_dynamics,
+}
+
+
+def mock_stats(url: str):
+    return requests.get(f"{url}/mock/stats").json()
+
+
+def run_sections(url: str, trace_memory: bool):
+    """Runs all sections once. Memory is traced in a separate run, because tracing slows Python down."""
+    rows = []
+    context = {}
+    for name, section in SECTIONS.items():
+        stats = mock_stats(url)
+        if trace_memory:
+            tracemalloc.start()
+        started = time.perf_counter()
+        issues = section(context)
+        seconds = time.perf_counter() - started
+        row = {"SECTION": name, "SECONDS": seconds, "ISSUES": issues}
+        if trace_memory:
+            row["PEAK_MB"] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+            tracemalloc.stop()
+        after = mock_stats(url)
+        row["REQUESTS"] = after["requests"] - stats["requests"]
+        row["THROTTLED"] = after["throttled"] - stats["throttled"]
+        row["RECEIVED_MB"] = (after["bytes"] - stats["bytes"]) / 2 ** 20
+        rows.append(row)
+    return rows
+
+
+def benchmark(issue_count: int, latency=0.0, page_size=100, changelog_page_size=100,
+              concurrency=my_jira.MAX_CONCURRENCY, throttle_rate=0.0, rps=None):
+    """One table row per section for the project of `issue_count` issues."""
+    ready = multiprocessing.Queue()
+    # the server runs in another process, so it doesn't share the interpreter and traced memory with the tool
+    server = multiprocessing.Process(target=serve, daemon=True, kwargs=dict(
+        issue_count=issue_count, latency=latency, page_size=page_size, changelog_page_size=changelog_page_size,
+        throttle_rate=throttle_rate, ready=ready))
+    server.start()
+    try:
+        url = ready.get(timeout=600)
+        my_jira.connect(url, "benchmark", "benchmark", concurrency, rps)
+        rows = run_sections(url, trace_memory=False)
+        memory_rows = run_sections(url, trace_memory=True)
+    finally:
+        server.terminate()
+        server.join()
+    for row, memory_row in zip(rows, memory_rows):
+        row["PEAK_MB"] = memory_row["PEAK_MB"]
+        row["ISSUES_PER_SECOND"] = row["ISSUES"] / row["SECONDS"] if row["ISSUES"] else None
+        row["SIZE"] = issue_count
+    return rows
+
+
+def compare(results: pd.DataFrame, baseline: pd.DataFrame):
+    """Time and peak memory of the results relative to the baseline, e.g. 1.25 is 25% slower."""
+    merged = results.merge(baseline, on=["SIZE", "SECTION"], suffixes=("", "_BASELINE"))
+    return pd.DataFrame({
+        "SIZE": merged.SIZE,
+        "SECTION": merged.SECTION,
+        "SECONDS_RATIO": (merged.SECONDS / merged.SECONDS_BASELINE).round(2),
+        "PEAK_MB_RATIO": (merged.PEAK_MB / merged.PEAK_MB_BASELINE).round(2),
+        "REQUESTS_DIFF": merged.REQUESTS - merged.REQUESTS_BASELINE,
+    })
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sprint metrics benchmark against a local mock Jira. ",
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("--sizes", type=str, default=DEFAULT_SIZES, help="Numbers of issues in the project")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds the mock Jira adds to every response")
+    parser.add_argument("--page-size", type=int, default=100, help="Max issues in one search page of the mock")
+    parser.add_argument("--changelog-page-size", type=int, default=100,
+                        help="Max changelog histories the mock returns with an issue")
+    parser.add_argument("--throttle-rate", type=float, default=0.0,
+                        help="Share of requests the mock Jira answers with 429 Too Many Requests")
+    parser.add_argument("--concurrency", type=int, default=my_jira.MAX_CONCURRENCY, help="Max parallel requests")
+    parser.add_argument("--rps", type=float, help="Max requests per second to the mock Jira")
+    parser.add_argument("--output", type=str, help="Save results to a JSON file")
+    parser.add_argument("--baseline", type=str, help="Compare with results saved before by --output")
+    args = parser.parse_args()
+
+    rows = []
+    for size in [int(size) for size in args.sizes.split(",")]:
+        rows += benchmark(size, args.latency, args.page_size, args.changelog_page_size, args.concurrency,
+                          args.throttle_rate, args.rps)
+    results = pd.DataFrame(rows, columns=["SIZE", "SECTION", "SECONDS", "ISSUES", "ISSUES_PER_SECOND", "PEAK_MB",
+                                          "REQUESTS", "THROTTLED", "RECEIVED_MB"])
+    with pd.option_context("display.max_columns", None, "display.width", None, "display.float_format", "{:.3f}".format):
+        print(results.to_string(index=False))
+        if args.baseline is not None:
+            with open(args.baseline) as f:
+                print(f"\nCompared with {args.baseline}:")
+                print(compare(results, pd.DataFrame(json.load(f))).to_string(index=False))
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results.to_dict(orient="records"), f, indent=2)
@@ -0,0 +1,175 @@
+"""Synthetic Jira data: boards, sprints and issues shaped like the REST API payloads the tool reads."""
+import random
+from datetime import datetime, timedelta
+
+STATUS_FLOW = ["To Do", "In Progress", "In Review", "Testing", "Done"]
+STATUS_CATEGORIES = {"To Do": "new", "Done": "done"}
+ISSUE_TYPES = ["Story", "Bug", "Task"]
+PRIORITIES = ["Critical", "High", "Medium", "Low"]
+LABELS = ["sprint_goals", "roadmap", "techdebt", "backend", "frontend"]
+SPRINT_LENGTH = timedelta(days=14)
+
+
+def jira_time(moment: datetime):
+    return moment.strftime("%Y-%m-%dT%H:%M:%S.000+0000")
+
+
+def sprint_time(moment: datetime):
+    return moment.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+class SyntheticJira:
+    """Generates `issue_count` issues of `project` spread over `sprint_count` closed sprints of one board."""
+
+    def __init__(self, project="BENCH", issue_count=1000, sprint_count=10, board_id=1, changelog_length=8, seed=0):
+        self.project = project
+        self.board_id = board_id
+        self.random = random.Random(seed)
+        self.started = datetime(2023, 1, 2, 10, 0)
+        self.sprints = {}
+        for i in range(sprint_count):
+            sprint_id = 100 + i
+            start = self.started + SPRINT_LENGTH * i
+            self.sprints[sprint_id] = {
+                "id": sprint_id,
+                "state": "closed",
+                "name": f"{project} Sprint {i + 1}",
+                "startDate": sprint_time(start),
+                "endDate": sprint_time(start + SPRINT_LENGTH),
+                "completeDate": sprint_time(start + SPRINT_LENGTH),
+                "originBoardId": board_id,
+            }
+        self.issues = {}
+        for i in range(issue_count):
+            issue = self.make_issue(i + 1, changelog_length)
+            self.issues[issue["key"]] = issue
+
+    def make_issue(self, number: int, changelog_length: int):
+        rnd = self.random
+        sprint_ids = sorted(self.sprints)
+        sprint_id = rnd.choice(sprint_ids)
+        sprint = self.sprints[sprint_id]
+        sprint_start = datetime.strptime(sprint["startDate"][:19], "%Y-%m-%dT%H:%M:%S")
+        created = sprint_start - timedelta(hours=rnd.randint(1, 24 * 30))
+        issue_type = rnd.choice(ISSUE_TYPES)
+        sprints = [sprint_id]
+        # some issues are carried over to the next sprint
+        if rnd.random() < 0.2 and sprint_id + 1 in self.sprints:
+            sprints.append(sprint_id + 1)
+
+        histories = []
+        moment = created
+        history_id = number * 1000
+        if len(sprints) > 1:
+            moment += timedelta(minutes=rnd.randint(5, 120))
+            history_id += 1
+            histories.append({"id": str(history_id), "created": jira_time(moment),
+                              "items": [{"field": "Sprint", "fromString": "", "toString": "",
+                                         "from": "", "to": str(sprints[0])}]})
+        steps = rnd.randint(1, max(1, changelog_length))
+        status_index = 0
+        finished = rnd.random() < 0.8
+        for _ in range(steps):
+            moment += timedelta(minutes=rnd.randint(30, 60 * 24 * 3))
+            if finished or status_index < len(STATUS_FLOW) - 2:
+                next_index = min(status_index + 1, len(STATUS_FLOW) - 1)
+            else:
+                next_index = status_index
+            # occasionally an issue goes back from review
+            if 1 < status_index < len(STATUS_FLOW) - 1 and rnd.random() < 0.15:
+                next_index = 1
+            if next_index == status_index:
+                continue
+            history_id += 1
+            histories.append({"id": str(history_id), "created": jira_time(moment),
+                              "items": [{"field": "status",
+                                         "fromString": STATUS_FLOW[status_index], "toString": STATUS_FLOW[next_index],
+                                         "from": str(status_index + 1), "to": str(next_index + 1)}]})
+            status_index = next_index
+            if status_index == len(STATUS_FLOW) - 1:
+                break
+        if finished and status_index != len(STATUS_FLOW) - 1:
+            moment += timedelta(hours=rnd.randint(1, 48))
+            history_id += 1
+            histories.append({"id": str(history_id), "created": jira_time(moment),
+                              "items": [{"field": "status",
+                                         "fromString": STATUS_FLOW[status_index], "toString": "Done",
+                                         "from": str(status_index + 1), "to": str(len(STATUS_FLOW))}]})
+            status_index = len(STATUS_FLOW) - 1
+        if len(sprints) > 1:
+            moment += timedelta(minutes=1)
+            history_id += 1
+            histories.append({"id": str(history_id), "created": jira_time(moment),
+                              "items": [{"field": "Sprint", "fromString": "", "toString": "",
+                                         "from": str(sprints[0]), "to": ", ".join(str(s) for s in sprints)}]})
+
+        status = STATUS_FLOW[status_index]
+        links = []
+        if rnd.random() < 0.1:
+            linked_project = rnd.choice(["UP", "PI"])
+            links.append({"id": str(number), "type": {"name": "Relates"},
+                          "outwardIssue": {"key": f"{linked_project}-{rnd.randint(100, 999)}",
+                                           "fields": {"summary": "Support request"}}})
+        if rnd.random() < 0.1:
+            links.append({"id": str(number + 1), "type": {"name": "Blocks"},
+                          "inwardIssue": {"key": f"{self.project}-{rnd.randint(1, number)}",
+                                          "fields": {"summary": "Blocker"}}})
+        summary = f"{issue_type} number {number}"
+        if rnd.random() < 0.1:
+            summary = f"Tech: cleanup {number}"
+
+        histories.reverse()  # Jira returns the newest history first
+        return {
+            "id": str(10000 + number),
+            "key": f"{self.project}-{number}",
+            "fields": {
+                "summary": summary,
+                "issuetype": {"name": issue_type},
+                "priority": {"name": rnd.choice(PRIORITIES)},
+                "labels": rnd.sample(LABELS, rnd.randint(0, 2)),
+                "status": {"name": status,
+                           "statusCategory": {"key": STATUS_CATEGORIES.get(status, "indeterminate")}},
+                "created": jira_time(created),
+                "updated": jira_time(moment),
+                "resolutiondate": jira_time(moment) if status == "Done" else None,
+                "customfield_10020": rnd.choice([None, 1, 2, 3, 5, 8]),
+                "customfield_10016": [{"id": s, "name": self.sprints[s]["name"], "state": "closed"} for s in sprints],
+                "issuelinks": links,
+            },
+            "changelog": {"startAt": 0, "maxResults": len(histories), "total": len(histories),
+                          "histories": histories},
+        }
+
+    def transition(self, key: str, status: str, moment=None):
+        """Moves the issue to the status like a user does in Jira (by default an hour after its last update).
+        Returns the changelog history of the change."""
+        issue = self.issues[key]
+        fields = issue["fields"]
+        if moment is None:
+            moment = datetime.strptime(fields["updated"][:19], "%Y-%m-%dT%H:%M:%S") + timedelta(hours=1)
+        histories = issue["changelog"]["histories"]
+        history = {"id": str(int(histories[0]["id"]) + 1 if histories else int(issue["id"]) * 1000),
+                   "created": jira_time(moment),
+                   "items": [{"field": "status", "fromString": fields["status"]["name"], "toString": status,
+                              "from": str(STATUS_FLOW.index(fields["status"]["name"]) + 1),
+                              "to": str(STATUS_FLOW.index(status) + 1)}]}
+        histories.insert(0, history)
+        issue["changelog"]["total"] = issue["changelog"]["maxResults"] = len(histories)
+        fields["status"] = {"name": status, "statusCategory": {"key": STATUS_CATEGORIES.get(status, "indeterminate")}}
+        fields["updated"] = jira_time(moment)
+        fields["resolutiondate"] = jira_time(moment) if status == "Done" else None
+        return history
+
+    def sprint_issue_keys(self, sprint_id: int):
+        return [key for key, issue in self.issues.items()
+                if any(sprint["id"] == sprint_id for sprint in issue["fields"]["customfield_10016"])]
+
+    def scope_change_chart(self, sprint_id: int):
+        """Greenhopper scope change chart: a change record per issue added to the sprint."""
+        start = datetime.strptime(self.sprints[sprint_id]["startDate"][:19], "%Y-%m-%dT%H:%M:%S")
+        timestamp = int(start.timestamp() * 1000)
+        changes = {}
+        for i, key in enumerate(self.sprint_issue_keys(sprint_id)):
+            changes.setdefault(str(timestamp + i), []).append({"key": key, "added": True})
+        return {"changes": changes, "startTime": timestamp,
+                "endTime": timestamp + int(SPRINT_LENGTH.total_seconds() * 1000)}
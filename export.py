@@ -0,0 +1,116 @@
+import argparse
+import json
+import os
+from my_jira import JiraIssue, get_raw_issue_pages
+
+ISSUE_COLUMNS = ["key", "project", "type", "priority", "status_category", "labels", "summary", "story_points",
+                 "sprint_ids", "created", "resolved", "linked_pi_up_issues"]
+CHANGELOG_COLUMNS = ["key", "history_id", "created", "author", "field", "from", "from_string", "to", "to_string"]
+
+
+def issue_row(raw: dict):
+    issue = JiraIssue(raw)
+    return {
+        "key": issue.key,
+        "project": issue.project,
+        "type": issue.issue_type,
+        "priority": issue.priority,
+        "status_category": issue.status_category,
+        "labels": issue.labels,
+        "summary": issue.summary,
+        "story_points": float(issue.story_points),
+        "sprint_ids": issue.sprint_ids,
+        "created": issue.created.isoformat(),
+        "resolved": None if issue.resolved is None else issue.resolved.isoformat(),
+        "linked_pi_up_issues": issue.linked_pi_up_issues,
+    }
+
+
+def changelog_rows(raw: dict):
+    """All changelog items of the issue, one row per changed field, starting from the beginning."""
+    for log in reversed(raw["changelog"]["histories"]):
+        for item in log["items"]:
+            yield {
+                "key": raw["key"],
+                "history_id": log["id"],
+                "created": log["created"],
+                "author": (log.get("author") or {}).get("displayName"),
+                "field": item["field"],
+                "from": item.get("from"),
+                "from_string": item.get("fromString"),
+                "to": item.get("to"),
+                "to_string": item.get("toString"),
+            }
+
+
+class JsonlWriter:
+
+    def __init__(self, path: str, columns: [str]):
+        self.file = open(path, "w", encoding="utf-8")
+
+    def write(self, rows: [dict]):
+        for row in rows:
+            self.file.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter:
+    """Writes every page as a separate row group, so only one page is kept in memory."""
+
+    def __init__(self, path: str, columns: [str]):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("!!! Parquet export needs pyarrow: pip install pyarrow")
+        types = {"labels": pa.list_(pa.string()), "sprint_ids": pa.list_(pa.int64()),
+                 "linked_pi_up_issues": pa.list_(pa.string()), "story_points": pa.float64()}
+        self.schema = pa.schema([(column, types.get(column, pa.string())) for column in columns])
+        self.pa = pa
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, rows: [dict]):
+        if rows:
+            self.writer.write_table(self.pa.Table.from_pylist(rows, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+WRITERS = {"jsonl": JsonlWriter, "parquet": ParquetWriter}
+
+
+def export_issues(jql: str, directory: str, file_format="jsonl"):
+    """Streams issues found by JQL to `issues.<format>` and their changelogs to `changelog.<format>`
+    page by page. Returns the number of exported issues."""
+    os.makedirs(directory, exist_ok=True)
+    writer = WRITERS[file_format]
+    issues_writer = writer(os.path.join(directory, f"issues.{file_format}"), ISSUE_COLUMNS)
+    changelog_writer = writer(os.path.join(directory, f"changelog.{file_format}"), CHANGELOG_COLUMNS)
+    count = 0
+    try:
+        for page in get_raw_issue_pages(jql):
+            issues_writer.write([issue_row(raw) for raw in page])
+            changelog_writer.write([row for raw in page for row in changelog_rows(raw)])
+            count += len(page)
+    finally:
+        issues_writer.close()
+        changelog_writer.close()
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export Jira issues with changelogs. ",
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("-p", "--project", type=str, help="Pass the project key")
+    parser.add_argument("-j", "--jql", type=str, help="Export issues by JQL instead of the whole project")
+    parser.add_argument("-o", "--output", type=str, default="export", help="Output directory")
+    parser.add_argument("-f", "--format", type=str, choices=WRITERS.keys(), default="jsonl", help="Output format")
+    args = parser.parse_args()
+    if args.project is None and args.jql is None:
+        parser.error("pass --project or --jql")
+
+    exported = export_issues(args.jql or f"project = {args.project}", args.output, args.format)
+    print(f"Exported {exported} issues to {args.output}")
@@ -0,0 +1,170 @@
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from my_jira import JiraIssue, search_page, complete_changelogs
+from profiler import PROFILER
+
+DEFAULT_STORE_PATH = "jira_store.sqlite"
+DEFAULT_TTL = timedelta(minutes=60)
+
+
+def sync_position(raw: dict):
+    """Position of the issue in `order by updated asc, key asc`."""
+    return raw["fields"]["updated"], int(raw["key"].rsplit("-", 1)[1])
+
+
+class IssueStore:
+    """Local SQLite copy of Jira issues (raw JSON with changelog) and of REST responses which never change.
+
+    Issues of a project are synced incrementally: only issues updated since the previous sync are downloaded,
+    and not more often than once per `ttl`. `offline` store never goes to Jira."""
+
+    def __init__(self, path=DEFAULT_STORE_PATH, ttl=DEFAULT_TTL, refresh=False, offline=False):
+        self.path = path
+        self.ttl = ttl
+        self.refresh = refresh
+        self.offline = offline
+        self.refreshed_projects = set()
+        # issues and documents may be saved from several threads fetching them in parallel
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS issues (
+                key TEXT PRIMARY KEY, id INTEGER, project TEXT, updated TEXT, raw TEXT);
+            CREATE INDEX IF NOT EXISTS issues_project ON issues (project, id);
+            CREATE TABLE IF NOT EXISTS issue_sprints (
+                key TEXT, sprint_id INTEGER, PRIMARY KEY (sprint_id, key));
+            CREATE TABLE IF NOT EXISTS syncs (
+                project TEXT PRIMARY KEY, synced_at TEXT, last_updated TEXT);
+            CREATE TABLE IF NOT EXISTS documents (
+                url TEXT PRIMARY KEY, raw TEXT);
+        """)
+
+    def save_issues(self, raw_issues: [dict]):
+        with self._lock, self.connection:
+            for raw in raw_issues:
+                sprints = raw["fields"].get("customfield_10016") or []
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO issues VALUES (?, ?, ?, ?, ?)",
+                    (raw["key"], int(raw["id"]), raw["key"].split("-")[0], raw["fields"]["updated"], json.dumps(raw)))
+                self.connection.execute("DELETE FROM issue_sprints WHERE key = ?", (raw["key"],))
+                self.connection.executemany(
+                    "INSERT INTO issue_sprints VALUES (?, ?)", [(raw["key"], sprint["id"]) for sprint in sprints])
+
+    def delete_issues(self, keys):
+        keys = list(keys)
+        with self._lock, self.connection:
+            self.connection.execute(f"DELETE FROM issues WHERE key IN ({', '.join('?' * len(keys))})", keys)
+            self.connection.execute(f"DELETE FROM issue_sprints WHERE key IN ({', '.join('?' * len(keys))})", keys)
+
+    def _issues(self, query: str, parameters=()):
+        for (raw,) in self.connection.execute(query, parameters):
+            yield JiraIssue(json.loads(raw))
+
+    def project_issues(self, project: str):
+        return self._issues("SELECT raw FROM issues WHERE project = ? ORDER BY id", (project,))
+
+    def sprint_issues(self, project: str, *sprint_ids):
+        """Issues of the project in any of the sprints."""
+        return list(self._issues(
+            f"SELECT raw FROM issues WHERE project = ? AND key IN "
+            f"(SELECT key FROM issue_sprints WHERE sprint_id IN ({', '.join('?' * len(sprint_ids))})) ORDER BY id",
+            [project] + [int(sprint_id) for sprint_id in sprint_ids]))
+
+    def get_issues(self, keys):
+        keys = list(keys)
+        return list(self._issues(
+            f"SELECT raw FROM issues WHERE key IN ({', '.join('?' * len(keys))}) ORDER BY id", keys))
+
+    def count_issues(self, project: str, issue_type: str, excluded_priorities=()):
+        """Numbers of issues of the type by status category, counted in SQL without parsing the issues.
+        Issues without priority are not counted, the same as `priority not in (...)` in JQL."""
+        priorities = [priority.lower() for priority in excluded_priorities]
+        rows = self.connection.execute(
+            f"SELECT json_extract(raw, '$.fields.status.statusCategory.key'), COUNT(*) FROM issues "
+            f"WHERE project = ? AND lower(json_extract(raw, '$.fields.issuetype.name')) = ? "
+            f"AND lower(json_extract(raw, '$.fields.priority.name')) NOT IN ({', '.join('?' * len(priorities))}) "
+            f"GROUP BY 1", [project, issue_type.lower()] + priorities)
+        return dict(rows.fetchall())
+
+    def get_document(self, url: str):
+        row = self.connection.execute("SELECT raw FROM documents WHERE url = ?", (url,)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def save_document(self, url: str, data):
+        with self._lock, self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO documents VALUES (?, ?)", (url, json.dumps(data)))
+
+    def sync_project(self, project: str):
+        """Download issues of the project updated since the last sync. The first sync and `refresh` download
+        the whole project again (that also drops issues deleted in Jira)."""
+        if self.offline:
+            return
+        row = self.connection.execute(
+            "SELECT synced_at, last_updated FROM syncs WHERE project = ?", (project,)).fetchone()
+        if row is None or not row[1] or (self.refresh and project not in self.refreshed_projects):
+            with self.connection:
+                self.connection.execute(
+                    "DELETE FROM issue_sprints WHERE key IN (SELECT key FROM issues WHERE project = ?)", (project,))
+                self.connection.execute("DELETE FROM issues WHERE project = ?", (project,))
+            last_updated = ""
+        else:
+            synced_at, last_updated = row
+            fresh = datetime.now() - datetime.fromisoformat(synced_at) < self.ttl
+            PROFILER.cache("store sync", fresh)
+            if fresh:
+                return
+
+        synced_at = datetime.now()
+        last_updated = self._sync_pages(project, last_updated)
+        self._save_sync(project, synced_at, last_updated)
+        self.refreshed_projects.add(project)
+
+    def _sync_pages(self, project: str, last_updated: str):
+        """Downloads issues updated since `last_updated` (all issues if it's empty), returns the new bookmark.
+
+        Issues come from the least recently updated, so if the sync fails (e.g. Jira keeps throttling),
+        the next one continues from the failed page instead of starting from scratch. Every page is searched
+        from the minute of the last saved issue (JQL dates have minute precision), skipping the issues
+        of that minute which are already saved. An issue updated during the sync moves to the end of the order
+        and shifts the rest back, so the search starts a bit earlier: if the first issue isn't saved yet,
+        issues were shifted and the search is repeated from twice as far back instead of skipping them."""
+        position = (last_updated, 0)
+        # issues of the search up to `position`, they are saved already
+        saved = 0
+        overlap = 1
+        while True:
+            jql = f"project = {project}"
+            if position[0]:
+                jql += f" and updated >= '{position[0][:16].replace('T', ' ')}'"
+            start_at = max(0, saved - overlap)
+            found = search_page(f"{jql} order by updated asc, key asc", start_at)
+            PROFILER.count("search pages")
+            issues = found["issues"]
+            if start_at and (not issues or sync_position(issues[0]) > position):
+                PROFILER.count("shifted sync pages")
+                overlap *= 2
+                continue
+            overlap = 1
+            last_page = start_at + len(issues) >= found["total"] or not issues
+            page = [raw for raw in issues if sync_position(raw) > position]
+            if page:
+                self.save_issues(complete_changelogs(page))
+                PROFILER.count("issues synced", len(page))
+                minute = position[0][:16]
+                position = max(sync_position(raw) for raw in page)
+                # not finished yet, so the next run syncs again
+                self._save_sync(project, datetime.min, position[0])
+                saved = (start_at if position[0][:16] == minute else 0) + \
+                    sum(raw["fields"]["updated"][:16] == position[0][:16] and sync_position(raw) <= position
+                        for raw in issues)
+            else:
+                saved = start_at + len(issues)
+            if last_page:
+                return position[0]
+
+    def _save_sync(self, project: str, synced_at: datetime, last_updated: str):
+        with self._lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO syncs VALUES (?, ?, ?)", (project, synced_at.isoformat(), last_updated))
@@ -0,0 +1,94 @@
+from sprint_snapshot import *
+from my_jira import count_jira_issues_by_jql
+
+PERCENTILES = (.5, .8, .9)
+PERCENTILE_INTERPOLATION = "linear"
+
+
+def story_points(issues: [JiraIssue]):
+    return sum([issue.story_points for issue in issues])
+
+
+def unplanned(issues: [JiraIssue]):
+    """Issues linked to UP/PI tickets."""
+    return [issue for issue in issues if issue.linked_pi_up_issues]
+
+
+def sprint_goals_issues(snapshot: SprintSnapshot):
+    return {"planned": snapshot.select(has_label("sprint_goals")),
+            "completed": snapshot.completed(has_label("sprint_goals"))}
+
+
+def velocity_issues(snapshot: SprintSnapshot):
+    committed = snapshot.committed_issues
+    if committed is None:
+        raise ValueError(f"!!! sprint {snapshot.sprint.sprint_id}: the snapshot was taken without committed issues")
+    completed = snapshot.completed()
+    completed_keys = keys(completed)
+    not_completed = [issue for issue in committed if issue.key not in completed_keys]
+    return {"committed": committed, "completed": completed, "not completed": not_completed}
+
+
+def unplanned_work_issues(snapshot: SprintSnapshot):
+    completed = snapshot.completed()
+    return {"completed": completed, "unplanned": unplanned(completed)}
+
+
+def focus_structure_issues(snapshot: SprintSnapshot):
+    """Completed issues split into unplanned / roadmap / bugs / tech debt / other.
+    Roadmap and tech debt issues may overlap, bugs don't include unplanned issues."""
+    completed = snapshot.completed()
+    unplanned_issues = unplanned(completed)
+    # bugs linked to PI or UP tickets are already in unplanned issues stats
+    unplanned_keys = keys(unplanned_issues)
+    bugs = [bug for bug in snapshot.completed(of_type("bug")) if bug.key not in unplanned_keys]
+    roadmap = snapshot.completed(has_label("roadmap"))
+    tech_debt = snapshot.completed(any_of(has_label("techdebt", "tech_debt", "tech"), summary_has_word("tech")))
+    categorized_keys = unplanned_keys | keys(bugs) | keys(tech_debt) | keys(roadmap)
+    other = [issue for issue in completed if issue.key not in categorized_keys]
+    return {"completed": completed, "unplanned": unplanned_issues, "roadmap": roadmap, "bugs": bugs,
+            "tech debt": tech_debt, "other": other}
+
+
+def development_time_tables(snapshot: SprintSnapshot, times=None):
+    """Lead time of done critical and high stories, cycle and in review time of all done issues,
+    each table sorted from the longest. Times of issues kept in `times` (by key) aren't counted again."""
+    # pandas is imported only when development time is counted
+    from status_time import development_times, cached_development_times
+    cycle_and_in_review_time_issues = snapshot.completed(in_status_category("done"))
+    # lead time issues are a part of cycle time issues, so time in statuses is counted once for all of them
+    table = development_times(cycle_and_in_review_time_issues) if times is None else \
+        cached_development_times(cycle_and_in_review_time_issues, times)
+    lead_time_issues = snapshot.completed(with_priority("Critical", "High"), of_type("Story"), in_status_category("done"))
+
+    tables = {
+        "lead time": table[table.KEY.isin(keys(lead_time_issues))][["KEY", "TYPE", "SUMMARY", "LEAD_TIME"]]
+        .reset_index(drop=True),
+        "cycle time": table[["KEY", "TYPE", "SUMMARY", "CYCLE_TIME"]].copy(),
+        "in review": table[["KEY", "TYPE", "SUMMARY", "IN_REVIEW"]].copy(),
+    }
+    for name, column in zip(tables, ["LEAD_TIME", "CYCLE_TIME", "IN_REVIEW"]):
+        tables[name].sort_values(by=column, inplace=True, ascending=False)
+    return tables
+
+
+def percentiles(column):
+    return [column.quantile(q, interpolation=PERCENTILE_INTERPOLATION) for q in PERCENTILES]
+
+
+def defect_counts(project: str, store=None, issues=None):
+    """Numbers of closed and open Medium+ bugs of the whole project. Bugs are counted in already fetched `issues`
+    of the project if they are passed, in the offline local store, otherwise Jira counts them."""
+    if issues is not None:
+        # `priority != low` in JQL doesn't match issues without priority
+        bugs = [issue for issue in issues
+                if of_type("bug")(issue) and issue.priority is not None and not with_priority("low")(issue)]
+        closed = len([bug for bug in bugs if in_status_category("done")(bug)])
+        return {"closed": closed, "open": len(bugs) - closed}
+    if store is not None and store.offline:
+        counts = store.count_issues(project, "bug", excluded_priorities=["low"])
+        return {"closed": counts.get("done", 0), "open": sum(counts.values()) - counts.get("done", 0)}
+    # only numbers of bugs are needed, so the bugs are not downloaded
+    bugs_jql = f"project = {project} and type = bug and priority != low"
+    return {"closed": count_jira_issues_by_jql(f"{bugs_jql} and statusCategory = Done"),
+            "open": count_jira_issues_by_jql(f"{bugs_jql} and statusCategory != Done")}
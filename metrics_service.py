@@ -0,0 +1,317 @@
+"""Long-running sprint metrics service: keeps the project issues and computed sections in memory, answers
+over a local HTTP API and keeps the model up to date by Jira webhooks."""
+import argparse
+import io
+import json
+import threading
+from collections import ChainMap
+from contextlib import redirect_stdout
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from my_jira import *
+from sprint_snapshot import *
+from metrics import *
+from issue_store import IssueStore, DEFAULT_STORE_PATH
+from sprint_metrics import SECTIONS, plan_fetch, print_sprint_report
+from results import issue_rows, metric_rows, table_json
+
+ISSUE_EVENTS = {"jira:issue_created", "jira:issue_updated", "jira:issue_deleted"}
+SPRINT_EVENTS = {"sprint_created", "sprint_updated", "sprint_started", "sprint_closed", "sprint_deleted"}
+
+
+class MetricsModel:
+    """Warm model of one project: its issues with changelogs, development time of each issue, sprint snapshots
+    and results of the report sections by sprint. They are computed on the first request and kept until a webhook
+    changes an issue of the sprint, then only that issue is fetched and only its sprints are computed again."""
+
+    def __init__(self, project: str, store=None):
+        self.project = project
+        self.store = store
+        self.registry = SprintRegistry(store)
+        self.issues = {}
+        # development time rows by issue key, see `cached_development_times`
+        self.times = {}
+        self.charts = {}
+        self.snapshots = {}
+        # issues committed to sprints, but belonging to other projects: only their story points are needed,
+        # so they are fetched once and kept (webhooks of other projects aren't handled)
+        self.committed = {}
+        # section results by (sprint id, section), sections of the whole project are kept with sprint id None
+        self.results = {}
+        self.webhooks = 0
+        # changed by every invalidation, so a snapshot fetched meanwhile isn't kept
+        self.generation = 0
+        self._lock = threading.RLock()
+        # Jira is requested outside `_lock`, a cold sprint is fetched once by the first request under its own lock
+        self._loading = {}
+
+    def load(self):
+        """All issues of the project: synced to the local store first if it's used."""
+        issues = get_all_issues_in_project(self.project, self.store)
+        with self._lock:
+            self.issues = {issue.key: issue for issue in issues}
+            self.generation += 1
+            self.times.clear()
+            self.snapshots.clear()
+            self.results.clear()
+        return self
+
+    def snapshot(self, sprint_id: int):
+        with self._lock:
+            loading = self._loading.setdefault(sprint_id, threading.Lock())
+        with loading:
+            with self._lock:
+                if sprint_id in self.snapshots:
+                    return self.snapshots[sprint_id]
+                generation = self.generation
+                chart = self.charts.get(sprint_id)
+                # copies, so webhooks can change the model while the snapshot is fetched
+                issues = ChainMap(dict(self.issues), dict(self.committed))
+            sprint = self.registry.get(sprint_id)
+            if chart is None:
+                chart = get_sprint_scope_chart(sprint, self.store)
+            snapshot = SprintSnapshot(self.project, sprint, self.store, issues, chart)
+            with self._lock:
+                self.committed.update({key: issue for key, issue in snapshot.issues.items()
+                                       if key not in issues and issue.project != self.project})
+                if self.generation != generation:
+                    # an issue changed meanwhile, the snapshot is returned, but fetched again on the next request
+                    return snapshot
+                self.charts[sprint_id] = chart
+                self.snapshots[sprint_id] = snapshot
+                return snapshot
+
+    def section(self, sprint_id, section: str, snapshot=None):
+        compute, _, needs = SECTIONS[section]
+        key = (None if "snapshot" not in needs else sprint_id, section)
+        if "snapshot" in needs and snapshot is None:
+            snapshot = self.snapshot(sprint_id)
+        with self._lock:
+            # results of a snapshot dropped by a webhook are computed, but not kept
+            current = snapshot is None or self.snapshots.get(sprint_id) is snapshot
+            if current and key in self.results:
+                return self.results[key]
+            if section == "defects":
+                # counted in the issues kept in memory instead of the store or Jira
+                result = defect_counts(self.project, issues=list(self.issues.values()))
+            elif section == "development":
+                result = development_time_tables(snapshot, self.times if current else {})
+            else:
+                result = compute(snapshot)
+            if current:
+                self.results[key] = result
+            return result
+
+    def sprint_results(self, sprint_id, sections: [str]):
+        """The same as `sprint_metrics.sprint_results`, but from the warm model."""
+        snapshot = None
+        if "snapshot" in plan_fetch(sections):
+            if sprint_id is None:
+                raise ValueError(f"!!! pass the sprint for sections: {', '.join(sections)}")
+            snapshot = self.snapshot(sprint_id)
+        return snapshot, {section: self.section(sprint_id, section, snapshot)
+                          for section in SECTIONS if section in sections}
+
+    def _invalidate(self, issues: [JiraIssue]):
+        """Drops everything computed from the issues (their old and new versions), returns ids of affected sprints."""
+        issue_keys = keys(issues)
+        self.generation += 1
+        for key in issue_keys:
+            self.times.pop(key, None)
+        # sprints of the issues and sprints they were committed to (snapshots keep them even if they left the sprint)
+        sprint_ids = set().union(*[issue.sprint_ids for issue in issues]) | \
+            {sprint_id for sprint_id, snapshot in self.snapshots.items() if issue_keys & snapshot.issues.keys()}
+        for sprint_id in sprint_ids:
+            self.snapshots.pop(sprint_id, None)
+            sprint = self.registry.sprints.get(sprint_id)
+            # scope of a closed sprint doesn't change, so its chart is kept
+            if sprint is None or not sprint.closed:
+                self.charts.pop(sprint_id, None)
+        self.results = {key: result for key, result in self.results.items()
+                        if key[0] is not None and key[0] not in sprint_ids}
+        return sorted(sprint_ids)
+
+    def update_issues(self, issue_keys):
+        """Fetches the issues again (with full changelogs, a webhook brings only the last change)."""
+        fetched = get_jira_issues_by_keys(issue_keys, self.store)
+        with self._lock:
+            changed = [self.issues[issue.key] for issue in fetched if issue.key in self.issues] + fetched
+            for issue in fetched:
+                self.issues[issue.key] = issue
+            return self._invalidate(changed)
+
+    def remove_issues(self, issue_keys):
+        issue_keys = set(issue_keys)
+        if self.store is not None:
+            self.store.delete_issues(issue_keys)
+        with self._lock:
+            removed = [self.issues.pop(key) for key in issue_keys if key in self.issues]
+            return self._invalidate(removed)
+
+    def update_sprint(self, sprint_id: int):
+        with self._lock:
+            self.generation += 1
+            self.registry.sprints.pop(sprint_id, None)
+            self.registry.boards.clear()
+            self.charts.pop(sprint_id, None)
+            self.snapshots.pop(sprint_id, None)
+            self.results = {key: result for key, result in self.results.items() if key[0] != sprint_id}
+            return [sprint_id]
+
+    def handle_webhook(self, payload: dict):
+        """Applies a Jira webhook event, returns ids of sprints whose results were dropped."""
+        event = payload.get("webhookEvent")
+        with self._lock:
+            self.webhooks += 1
+        if event in SPRINT_EVENTS:
+            sprint = payload.get("sprint")
+            sprint_id = str(sprint.get("id")) if isinstance(sprint, dict) else ""
+            if not sprint_id.isdigit():
+                raise ValueError(f"!!! {event} webhook should have the sprint id")
+            return self.update_sprint(int(sprint_id))
+        if event not in ISSUE_EVENTS:
+            return []
+        issue = payload.get("issue")
+        key = issue.get("key") if isinstance(issue, dict) else None
+        if not isinstance(key, str):
+            raise ValueError(f"!!! {event} webhook should have the issue key")
+        if key.split("-")[0] != self.project:
+            return []
+        if event == "jira:issue_deleted":
+            return self.remove_issues([key])
+        return self.update_issues([key])
+
+    def status(self):
+        with self._lock:
+            return {"project": self.project, "issues": len(self.issues), "development_times": len(self.times),
+                    "snapshots": sorted(self.snapshots), "results": len(self.results), "webhooks": self.webhooks}
+
+
+class MetricsService:
+    """Local HTTP API of the model:
+    GET /metrics, /issues - aggregate metrics and per-issue rows as JSON, /report - the text report,
+    all with `sprint` and optional `sections` query parameters (all sections by default);
+    GET /status - what is kept in memory; POST /webhook - Jira webhook events."""
+
+    def __init__(self, model: MetricsModel, host="127.0.0.1", port=0):
+        self.model = model
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+        # the text report is printed, so reports of parallel requests are rendered one by one
+        self._render_lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def get(self, path: str, query: dict):
+        """Status code, content type and body of the response."""
+        if path == "/status":
+            return 200, "application/json", json.dumps(self.model.status())
+        if path not in ("/metrics", "/issues", "/report"):
+            return 404, "application/json", json.dumps({"error": f"Not found: {path}"})
+        sprint_id = query.get("sprint", [None])[0]
+        if sprint_id is not None and not sprint_id.isdigit():
+            raise ValueError(f"!!! sprint should be an id, got {sprint_id}")
+        sprint_id = None if sprint_id is None else int(sprint_id)
+        # without a sprint only sections of the whole project are collected by default
+        sections = [section for section in SECTIONS if sprint_id is not None or "snapshot" not in SECTIONS[section][2]]
+        if "sections" in query:
+            sections = [section.strip() for section in query["sections"][0].split(",") if section.strip()]
+        unknown = [section for section in sections if section not in SECTIONS]
+        if unknown:
+            raise ValueError(f"!!! unknown sections: {', '.join(unknown)}, choose from: {', '.join(SECTIONS)}")
+
+        snapshot, results = self.model.sprint_results(sprint_id, sections)
+        if path == "/metrics":
+            return 200, "application/json", table_json(metric_rows(self.model.project, sprint_id, results))
+        if path == "/issues":
+            return 200, "application/json", table_json(issue_rows(self.model.project, snapshot, results))
+        report = io.StringIO()
+        with self._render_lock, redirect_stdout(report):
+            print_sprint_report(self.model.project, snapshot, results)
+        return 200, "text/plain; charset=utf-8", report.getvalue()
+
+    def _handler(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                self._respond(lambda: service.get(parsed.path, parse_qs(parsed.query)))
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+                def webhook():
+                    if urlparse(self.path).path != "/webhook":
+                        return 404, "application/json", json.dumps({"error": f"Not found: {self.path}"})
+                    try:
+                        payload = json.loads(body or b"{}")
+                    except json.JSONDecodeError as e:
+                        raise ValueError(f"!!! webhook body should be JSON: {e}")
+                    if not isinstance(payload, dict):
+                        raise ValueError("!!! webhook body should be a JSON object")
+                    sprints = service.model.handle_webhook(payload)
+                    return 200, "application/json", json.dumps({"event": payload.get("webhookEvent"),
+                                                                "sprints": sprints})
+                self._respond(webhook)
+
+            def _respond(self, handle):
+                try:
+                    status, content_type, body = handle()
+                except ValueError as e:
+                    status, content_type, body = 400, "application/json", json.dumps({"error": str(e)})
+                except Exception as e:
+                    status, content_type, body = 500, "application/json", json.dumps({"error": repr(e)})
+                data = body.encode()
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sprint metrics service with a warm cache. ",
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("-p", "--project", type=str, help="Pass the project key")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on")
+    parser.add_argument("--store", type=str, nargs="?", const=DEFAULT_STORE_PATH,
+                        help=f"Keep the project issues in a local store file ({DEFAULT_STORE_PATH} if no file), "
+                             f"so restarts download only issues updated since the last sync")
+    parser.add_argument("--refresh", action="store_true", help="Download all issues of the project to the store again")
+    parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENCY, help="Max parallel requests to Jira")
+    parser.add_argument("--rps", type=float, help="Max requests per second to Jira (not limited by default)")
+    args = parser.parse_args()
+
+    connect(max_concurrency=args.concurrency, rps=args.rps)
+    # webhooks sent while the service was down are missed, so the store is always synced on start
+    store = None if args.store is None else IssueStore(args.store, ttl=timedelta(0), refresh=args.refresh)
+    model = MetricsModel(args.project, store).load()
+    service = MetricsService(model, args.host, args.port).start()
+    print(f"Serving '{args.project}' metrics ({len(model.issues)} issues) at {service.url}", flush=True)
+    service.thread.join()
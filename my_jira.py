@@ -1,158 +1,514 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque, namedtuple
+from itertools import islice
+import threading
+import time
 import re
 import base64
-import requests as r
-from jira import JIRA
-import jira.client
-from auth import EMAIL, TOKEN, BASE_URL
+from profiler import PROFILER
+from scheduler import RequestScheduler
 
+# max number of parallel requests to Jira, e.g. for pages of one search
+MAX_CONCURRENCY = 8
+PAGE_SIZE = 100
+# seconds to wait for a response, the request is retried after that
+REQUEST_TIMEOUT = 60
+# keys in one `key in (...)` query, to keep JQL and the url short
+KEYS_PER_QUERY = 100
+
+
+class JiraConnection:
+    """Jira url, credentials, the pooled keep-alive HTTP session and the scheduler of all requests.
+    Nothing is done until the first request: credentials are read from `auth.py` if they are not passed,
+    and the session is created then, so importing modules and `--help` don't touch the network.
+    `rps` caps requests per second of all threads together."""
+
+    def __init__(self, base_url=None, email=None, token=None, max_concurrency=MAX_CONCURRENCY, rps=None):
+        self._base_url = base_url
+        self.email = email
+        self.token = token
+        self.max_concurrency = max_concurrency
+        self.scheduler = RequestScheduler(max_concurrency, rps)
+        self._session = None
+        self._lock = threading.Lock()
+
+    def _load_auth(self):
+        from auth import BASE_URL, EMAIL, TOKEN
+        self._base_url = self._base_url or BASE_URL
+        self.email = self.email or EMAIL
+        self.token = self.token or TOKEN
+
+    @property
+    def base_url(self):
+        if self._base_url is None:
+            self._load_auth()
+        return self._base_url
+
+    @property
+    def session(self):
+        if self._session is None:
+            # the first requests may come from several threads at once
+            with self._lock:
+                if self._session is None:
+                    self._session = self.create_session()
+        return self._session
+
+    def create_session(self):
+        import requests
+        from requests.adapters import HTTPAdapter
+        if self.email is None or self.token is None:
+            self._load_auth()
+        session = requests.Session()
+        authorization = base64.b64encode(f"{self.email}:{self.token}".encode("ascii")).decode("ascii")
+        session.headers["Authorization"] = f"Basic {authorization}"
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+
+JIRA = JiraConnection()
+
+
+def connect(base_url=None, email=None, token=None, max_concurrency=MAX_CONCURRENCY, rps=None):
+    """Replaces the connection used by all requests, e.g. to change concurrency or to use another Jira."""
+    global JIRA
+    JIRA = JiraConnection(base_url, email, token, max_concurrency, rps)
+    return JIRA
 
-AUTHORIZATION_HEADER = base64.b64encode((EMAIL + ":" + TOKEN).encode("ascii")).decode('ascii')
-JIRA_CLIENT = JIRA(server=BASE_URL, basic_auth=(EMAIL, TOKEN))
 
 TIME_FORMAT = "%Y-%m-%dT%H:%M:%S"
 
+IN_REVIEW_STATUSES = ["In Review"]
+CYCLE_TIME_STATUSES = IN_REVIEW_STATUSES + \
+    ["In Progress", "Product Review", "PO Review", "Ready for testing", "Testing", "Ready for Deploy"]
+LEAD_TIME_STATUSES = CYCLE_TIME_STATUSES + ["To Do", "New", "Analyze"]
+ALL_STATUSES = LEAD_TIME_STATUSES + ["Done"]
+
 
 class JiraIssue:
+    """Fields of the issue used by metrics. Status and sprint changes are kept from the changelog,
+    the raw issue JSON only if `keep_raw` is passed."""
+
+    __slots__ = ("raw", "summary", "key", "issue_type", "priority", "labels", "status_category", "created",
+                 "resolved", "status_changes", "sprint_changes", "linked_pi_up_issues", "project", "story_points",
+                 "sprint_ids", "all_sprint_ids", "time_in_statuses", "development_time")
+    story_points_field = "customfield_10020"
+    sprints_field = "customfield_10016"
+
+    def __init__(self, raw: dict, keep_raw=False):
+        """`raw` is the issue JSON as returned by Jira search with expanded changelog."""
+        fields = raw["fields"]
+        self.raw = raw if keep_raw else None
+        self.summary = fields["summary"]
+        self.key = raw["key"]
+        self.issue_type = fields["issuetype"]["name"]
+        self.priority = None if fields["priority"] is None else fields["priority"]["name"]
+        self.labels = fields["labels"]
+        self.status_category = fields["status"]["statusCategory"]["key"]
+        self.created = datetime.strptime(fields["created"][:-9], TIME_FORMAT)
+        self.resolved = \
+            None if fields["resolutiondate"] is None \
+            else datetime.strptime(fields["resolutiondate"][:-9], TIME_FORMAT)
+
+        # (time, from, to) of status changes and (from, to) of sprint changes, starting from the beginning,
+        # None if the changelog wasn't fetched
+        self.status_changes = None if "changelog" not in raw else []
+        self.sprint_changes = None if "changelog" not in raw else []
+        for log in reversed(raw["changelog"]["histories"] if "changelog" in raw else []):
+            for item in log["items"]:
+                if item["field"] == "status":
+                    self.status_changes.append((log["created"], item["fromString"], item["toString"]))
+                elif item["field"] == "Sprint":
+                    self.sprint_changes.append((item["from"], item["to"]))
 
-    def __init__(self, jira_issue: jira.client.Issue):
-        self.jira_issue = jira_issue
-        self.raw = jira_issue.raw
-        self.summary = jira_issue.fields.summary
-        self.key = jira_issue.key
-        self.issue_type = self.raw["fields"]["issuetype"]["name"]
-        self.created = datetime.strptime(self.raw["fields"]["created"][:-9], TIME_FORMAT)
-        self.changelog = self.raw["changelog"]["histories"]
-        self.changelog.reverse()  # now starts from the beginning
-        self.linked_pi_up_issues = list(set(re.findall("'key': '(UP-\d\d\d|PI-\d\d\d)", str(self.raw))))
+        self.linked_pi_up_issues = []
+        for link in fields.get("issuelinks") or []:
+            linked_issue = link.get("inwardIssue") or link.get("outwardIssue")
+            if re.fullmatch(r"(UP|PI)-\d+", linked_issue["key"]) and linked_issue["key"] not in self.linked_pi_up_issues:
+                self.linked_pi_up_issues.append(linked_issue["key"])
         self.project = self.key.split("-")[0]
-        self.story_points_field = "customfield_10020"
-        self.story_points = 0 if self.raw["fields"][self.story_points_field] is None else self.raw["fields"][self.story_points_field]
-        self.sprints_field = "customfield_10016"
+        self.story_points = 0 if fields[self.story_points_field] is None else fields[self.story_points_field]
         self.sprint_ids = \
-            [] if self.raw["fields"][self.sprints_field] is None \
-            else [sprint["id"] for sprint in self.raw["fields"][self.sprints_field]]
+            [] if fields[self.sprints_field] is None \
+            else [sprint["id"] for sprint in fields[self.sprints_field]]
+        self.all_sprint_ids = None
         self.time_in_statuses = None
         self.development_time = None
 
     def find_all_sprints_from_changelog(self):
         """Return all sprint ids where the issue presented, even if it was removed from it (searching the changelog)."""
+        if self.sprint_changes is None:
+            raise ValueError(f"!!! {self.key}: changelog wasn't fetched, can't find sprints in it")
         self.all_sprint_ids = set()
-        for log in self.changelog:
-            for item in log["items"]:
-                if item["field"] == "Sprint":
-                    if item["to"].isdigit():
-                        self.all_sprint_ids.add(item["to"])
-                    elif item["to"] == "":
-                        pass
-                    else:
-                        self.all_sprint_ids.update(item["to"].split(", "))
-
-                    if item["from"].isdigit():
-                        self.all_sprint_ids.add(item["from"])
-                    elif item["from"] == "":
-                        pass
-                    else:
-                        self.all_sprint_ids.update(item["from"].split(", "))
+        for sprint_from, sprint_to in self.sprint_changes:
+            if sprint_to.isdigit():
+                self.all_sprint_ids.add(sprint_to)
+            elif sprint_to == "":
+                pass
+            else:
+                self.all_sprint_ids.update(sprint_to.split(", "))
+
+            if sprint_from.isdigit():
+                self.all_sprint_ids.add(sprint_from)
+            elif sprint_from == "":
+                pass
+            else:
+                self.all_sprint_ids.update(sprint_from.split(", "))
         return self.all_sprint_ids
 
     def count_time_in_all_statuses(self):
+        if self.status_changes is None:
+            raise ValueError(f"!!! {self.key}: changelog wasn't fetched, can't count time in statuses")
 
         # find all statuses where issue was
         statuses = set()
-        for log in self.changelog:
-            for i in log["items"]:
-                if i["field"] == 'status':
-                    statuses.add(i["fromString"])
-                    statuses.add(i["toString"])
+        for _, status_from, status_to in self.status_changes:
+            statuses.add(status_from)
+            statuses.add(status_to)
 
         # count time in each status
         self.time_in_statuses = {status: timedelta() for status in statuses}
         i = 0  # need it to separate logic when find the first status change
-        for log in self.changelog:
-            for item in log["items"]:
-                if item["field"] == 'status':
-                    if i == 0:
-                        # first status change
-                        last_change_status_time = datetime.strptime(log["created"][:-9], TIME_FORMAT)
-                        self.time_in_statuses[item["fromString"]] = last_change_status_time - self.created
-                        i += 1
-                        continue
-                    status_changed_time = datetime.strptime(log["created"][:-9], TIME_FORMAT)
-                    delta = status_changed_time - last_change_status_time
-                    self.time_in_statuses[item["fromString"]] += delta
-                    last_change_status_time = status_changed_time
-
-        from_created_to_done = timedelta(0)
-        for i in self.time_in_statuses.items():
-            from_created_to_done += i[1]
+        for created, status_from, _ in self.status_changes:
+            if i == 0:
+                # first status change
+                last_change_status_time = datetime.strptime(created[:-9], TIME_FORMAT)
+                self.time_in_statuses[status_from] = last_change_status_time - self.created
+                i += 1
+                continue
+            status_changed_time = datetime.strptime(created[:-9], TIME_FORMAT)
+            delta = status_changed_time - last_change_status_time
+            self.time_in_statuses[status_from] += delta
+            last_change_status_time = status_changed_time
 
     def count_development_time(self):
         if self.time_in_statuses is None:
             self.count_time_in_all_statuses()
 
-        in_review_statuses = ["In Review"]
-        cycle_time_statuses = in_review_statuses + \
-            ["In Progress", "Product Review", "PO Review", "Ready for testing", "Testing", "Ready for Deploy"]
-        lead_time_statuses = cycle_time_statuses + ["To Do", "New", "Analyze"]
-        all_statuses = lead_time_statuses + ["Done"]
-
         self.development_time = {"lead time": timedelta(), "cycle time": timedelta(), "in review": timedelta()}
 
-        for status, time in self.time_in_statuses.items():
-            if status in lead_time_statuses:
-                self.development_time["lead time"] += time
-            if status in cycle_time_statuses:
-                self.development_time["cycle time"] += time
-            if status in in_review_statuses:
-                self.development_time["in review"] += time
+        for status, duration in self.time_in_statuses.items():
+            if status in LEAD_TIME_STATUSES:
+                self.development_time["lead time"] += duration
+            if status in CYCLE_TIME_STATUSES:
+                self.development_time["cycle time"] += duration
+            if status in IN_REVIEW_STATUSES:
+                self.development_time["in review"] += duration
 
         # check that we don't miss any status in stats
         for status in self.time_in_statuses.keys():
-            if status not in all_statuses:
+            if status not in ALL_STATUSES:
                 raise ValueError(f"!!! {self.key}: was in status {status}, but we missed it when count time in statuses")
 
 
+# all fields used by JiraIssue
+ISSUE_FIELDS = ["summary", "issuetype", "priority", "labels", "status", "created", "resolutiondate", "updated",
+                "issuelinks", JiraIssue.story_points_field, JiraIssue.sprints_field]
+
+
+def sprint_url(sprint_id):
+    return f"{JIRA.base_url}/rest/agile/1.0/sprint/{sprint_id}"
+
+
+def parse_sprint_date(value: str):
+    """Sprint dates come with milliseconds and time zone, e.g. 2023-01-02T10:00:00.000Z."""
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
 class JiraSprint:
 
-    def __init__(self, sprint_id: str):
-        self.sprint_id = sprint_id
-        self.data = r.get(
-            url=f"{BASE_URL}/rest/agile/1.0/sprint/{sprint_id}",
-            headers={"Authorization": f"Basic {AUTHORIZATION_HEADER}"}
-        ).json()
+    def __init__(self, sprint_id, store=None, data=None):
+        """`data` is the sprint JSON if it's already fetched, e.g. from the board sprints list.
+        Better take sprints from `SprintRegistry`, so each sprint is fetched once."""
+        self.sprint_id = int(sprint_id)
+        self.data = data if data is not None else \
+            get_json(sprint_url(sprint_id), store, cacheable=lambda data: data["state"] == "closed")
         self.name = self.data["name"]
         self.board_id = self.data["originBoardId"]
-        self.start = self.data["startDate"].split("T")
-        self.start = "'" + self.start[0] + " " + self.start[1][:-8] + "'"
-        self.end = self.data["completeDate"].split("T")
-        self.end = "'" + self.end[0] + " " + self.end[1][:-8] + "'"
+        self.closed = self.data["state"] == "closed"
+        self.start_date = parse_sprint_date(self.data["startDate"])
+        # an active sprint isn't completed yet, so it's taken till its planned end
+        self.complete_date = parse_sprint_date(self.data.get("completeDate") or self.data["endDate"])
+        # the same minute-precision bounds as in JQL (in the sprint time zone), to filter issues locally
+        self.start_time = self.start_date.replace(second=0, microsecond=0, tzinfo=None)
+        self.end_time = self.complete_date.replace(second=0, microsecond=0, tzinfo=None)
+        self.start = f"'{self.start_time:%Y-%m-%d %H:%M}'"
+        self.end = f"'{self.end_time:%Y-%m-%d %H:%M}'"
+
+
+def jira_get(url: str, params=None):
+    """Throttled and failed requests are retried by the scheduler, so a failed page is fetched again alone."""
+    def send():
+        started = time.perf_counter()
+        response = JIRA.session.get(url, params=params, timeout=REQUEST_TIMEOUT)
+        PROFILER.request(url, time.perf_counter() - started, len(response.content), response.status_code)
+        return response
+
+    response = JIRA.scheduler.request(send)
+    response.raise_for_status()
+    return response.json()
+
+
+def get_json(url: str, store=None, cacheable=lambda data: True):
+    """GET request to Jira REST API. Responses which never change (`cacheable`) are kept in the local store."""
+    data = None if store is None else store.get_document(url)
+    if store is not None:
+        PROFILER.cache("store documents", data is not None)
+    if data is None:
+        if store is not None and store.offline:
+            raise ValueError(f"!!! {url} is not in the local store, run without --offline to fetch it")
+        data = jira_get(url)
+        if store is not None and cacheable(data):
+            store.save_document(url, data)
+    return data
+
+
+def search_page(jql: str, start_at: int, max_results=PAGE_SIZE, fields=ISSUE_FIELDS, changelog=True,
+                validate_query="strict"):
+    """`fields` is a list of issue fields to return (all fields if None), `changelog` - to expand changelog.
+    With `validate_query` "warn" Jira skips unknown values (e.g. keys of deleted issues) instead of failing with 400."""
+    params = {"jql": jql, "startAt": start_at, "maxResults": max_results, "validateQuery": validate_query}
+    if fields is not None:
+        params["fields"] = ",".join(fields)
+    if changelog:
+        params["expand"] = "changelog"
+    return jira_get(f"{JIRA.base_url}/rest/api/2/search", params=params)
+
+
+def count_jira_issues_by_jql(jql: str):
+    """Number of issues found by JQL, without downloading them."""
+    return search_page(jql, 0, max_results=0, fields=["key"], changelog=False)["total"]
+
+
+def changelog_page(issue_key: str, start_at: int):
+    """Changelog histories of the issue from the oldest, 100 per page."""
+    return jira_get(f"{JIRA.base_url}/rest/api/2/issue/{issue_key}/changelog",
+                    params={"startAt": start_at, "maxResults": PAGE_SIZE})
+
+
+def complete_changelogs(raw_issues: [dict], max_workers=None):
+    """Search returns only a part of long changelogs (the latest histories). The missing histories are fetched
+    from the changelog API in parallel for all truncated issues and merged into the issue JSON."""
+
+    def complete(raw: dict):
+        changelog = raw["changelog"]
+        histories = {history["id"]: history for history in changelog["histories"]}
+        # the changelog API starts from the oldest histories, which are missing, so usually one page is enough
+        start_at = 0
+        while len(histories) < changelog["total"] and start_at < changelog["total"]:
+            page = changelog_page(raw["key"], start_at)["values"]
+            if not page:
+                break
+            histories.update((history["id"], history) for history in page)
+            start_at += len(page)
+        # the same order as in search results: the newest history first
+        changelog["histories"] = sorted(histories.values(), key=lambda history: int(history["id"]), reverse=True)
+        changelog["maxResults"] = len(histories)
+
+    truncated = [raw for raw in raw_issues if raw["changelog"]["total"] > len(raw["changelog"]["histories"])]
+    PROFILER.count("truncated changelogs", len(truncated))
+    if truncated:
+        with ThreadPoolExecutor(max_workers=max_workers or JIRA.max_concurrency) as executor:
+            list(executor.map(complete, truncated))
+    return raw_issues
 
 
-def get_jira_issues_by_jql(jql: str, jira_client: jira.client.JIRA, start_at=0):
-    """Returns list of custom JiraIssue class objects. Jira API cannot return more than 100 issues at once,
-    so we need to iterate until we get less than 100 issues in response."""
-    i = start_at
-    issues = []
+def get_raw_issue_pages(jql: str, start_at=0, max_workers=None, fields=ISSUE_FIELDS, changelog=True,
+                        validate_query="strict"):
+    """Yields pages of issue JSON in search order. Jira API cannot return more than 100 issues at once,
+    so the first page tells the total and the rest pages are fetched in parallel.
+    Not more than `max_workers` pages are fetched ahead of the consumer, so memory doesn't grow with the total."""
+    max_workers = max_workers or JIRA.max_concurrency
+
+    def fetch(i, page_size=PAGE_SIZE):
+        page = search_page(jql, i, page_size, fields, changelog, validate_query)["issues"]
+        PROFILER.count("search pages")
+        PROFILER.count("issues fetched", len(page))
+        return complete_changelogs(page, max_workers) if changelog else page
+
+    first_page = search_page(jql, start_at, PAGE_SIZE, fields, changelog, validate_query)
+    PROFILER.count("search pages")
+    PROFILER.count("issues fetched", len(first_page["issues"]))
+    yield complete_changelogs(first_page["issues"], max_workers) if changelog else first_page["issues"]
+    # Jira may return less issues per page than asked
+    page_size = first_page["maxResults"]
+    if not first_page["issues"] or page_size == 0:
+        return
+    starts = iter(range(start_at + page_size, first_page["total"], page_size))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pages = deque(executor.submit(fetch, i, page_size) for i in islice(starts, max_workers))
+        while pages:
+            page = pages.popleft().result()
+            for i in islice(starts, 1):
+                pages.append(executor.submit(fetch, i, page_size))
+            yield page
+
+
+def iter_jira_issues_by_jql(jql: str, start_at=0, store=None, changelog=True, validate_query="strict"):
+    """Yields custom JiraIssue class objects as pages arrive. Fetched issues are saved to the local store
+    if it's passed and they have the changelog. JiraIssue needs all `ISSUE_FIELDS`, so other projections
+    are fetched with `get_raw_issue_pages`."""
+    for page in get_raw_issue_pages(jql, start_at, changelog=changelog, validate_query=validate_query):
+        if store is not None and changelog:
+            store.save_issues(page)
+        with PROFILER.span("issue parsing"):
+            issues = [JiraIssue(raw) for raw in page]
+        yield from issues
+
+
+def get_jira_issues_by_jql(jql: str, start_at=0, store=None, changelog=True, validate_query="strict"):
+    """Returns list of custom JiraIssue class objects. Fetched issues are saved to the local store if it's passed.
+    Without `changelog` the issues don't have status and sprint changes."""
+    return list(iter_jira_issues_by_jql(jql, start_at, store, changelog, validate_query))
+
+
+def get_jira_issues_by_keys(issue_keys, store=None, issues=None, changelog=True):
+    """Issues by keys. Already fetched `issues` (by key) are taken from them, the rest are searched
+    by `KEYS_PER_QUERY` keys in parallel. Keys not found in Jira (e.g. of deleted issues) are skipped."""
+    issues = issues or {}
+    issue_keys = sorted(set(issue_keys))
+    found = [issues[key] for key in issue_keys if key in issues]
+    missing = [key for key in issue_keys if key not in issues]
+    chunks = [missing[i:i + KEYS_PER_QUERY] for i in range(0, len(missing), KEYS_PER_QUERY)]
+
+    def search(chunk: [str]):
+        # by default Jira fails the whole query with 400 if one of the keys doesn't exist
+        return get_jira_issues_by_jql(f"key in ({', '.join(chunk)})", store=store, changelog=changelog,
+                                      validate_query="warn")
+
+    if len(chunks) == 1:
+        return found + search(chunks[0])
+    with ThreadPoolExecutor(max_workers=JIRA.max_concurrency) as executor:
+        for chunk_issues in executor.map(search, chunks):
+            found += chunk_issues
+    return found
+
+
+def iter_all_issues_in_project(project_id: str, store=None):
+    if store is None:
+        return iter_jira_issues_by_jql(f"project = {project_id}")
+    store.sync_project(project_id)
+    return store.project_issues(project_id)
+
+
+def get_all_issues_in_project(project_id: str, store=None):
+    return list(iter_all_issues_in_project(project_id, store))
+
+
+def get_board_sprints(board_id, state="closed"):
+    """All sprints of the board in the board order (the API returns them by 50 per page)."""
+    sprints = []
     while True:
-        issues_i = jira_client.search_issues(jql_str=jql, expand="changelog", maxResults=100, startAt=i)
-        for issue in issues_i:
-            issues.append(JiraIssue(issue))
-        i += 100
-        if len(issues_i) < 100:
-            break
-    return issues
-
-
-def get_all_issues_in_project(project_id: str):
-    return get_jira_issues_by_jql(f"project = {project_id}", JIRA_CLIENT)
-
-
-def get_all_issues_from_sprint_greenhopper(sprint_id: str, board_id: str):
-    """Get all issues appeared in sprint according to Greenhopper log"""
-    gh = r.get(
-        url=f"{BASE_URL}/rest/greenhopper/1.0/rapid/charts/scopechangeburndownchart?rapidViewId={board_id}&sprintId={sprint_id}",
-        headers={"Authorization": f"Basic {AUTHORIZATION_HEADER}"}).json()
-    keys = set(value[0]["key"] for (key, value) in gh["changes"].items())
-    issues = get_jira_issues_by_jql(f"issue in ({tuple(keys)})", JIRA_CLIENT)
-    return issues
\ No newline at end of file
+        page = jira_get(f"{JIRA.base_url}/rest/agile/1.0/board/{board_id}/sprint",
+                        params={"state": state, "startAt": len(sprints), "maxResults": 50})
+        sprints += [JiraSprint(sprint["id"], data=sprint) for sprint in page["values"]]
+        if page["isLast"] or not page["values"]:
+            return sprints
+
+
+class SprintRegistry:
+    """Sprints by id, each fetched once per run. Closed sprints never change, so they are kept in the local store.
+    Many sprints are resolved with the sprints lists of their boards instead of a request per sprint."""
+
+    def __init__(self, store=None):
+        self.store = store
+        self.sprints = {}
+        self.boards = {}
+
+    def _remember(self, sprint: JiraSprint):
+        if sprint.sprint_id not in self.sprints and self.store is not None and sprint.closed:
+            self.store.save_document(sprint_url(sprint.sprint_id), sprint.data)
+        self.sprints[sprint.sprint_id] = sprint
+        return sprint
+
+    def _stored(self, sprint_id: int):
+        data = None if self.store is None else self.store.get_document(sprint_url(sprint_id))
+        return None if data is None else self._remember(JiraSprint(sprint_id, data=data))
+
+    def get(self, sprint_id):
+        sprint_id = int(sprint_id)
+        PROFILER.cache("sprints", sprint_id in self.sprints)
+        if sprint_id not in self.sprints:
+            self._remember(JiraSprint(sprint_id, self.store))
+        return self.sprints[sprint_id]
+
+    def board_sprints(self, board_id):
+        """Active and closed sprints of the board in the board order, the list is fetched once per run."""
+        if self.store is not None and self.store.offline:
+            raise ValueError(f"!!! sprints of board {board_id} are not kept in the local store, "
+                             f"pass sprint ids or run without --offline")
+        if str(board_id) not in self.boards:
+            self.boards[str(board_id)] = [self._remember(sprint)
+                                          for sprint in get_board_sprints(board_id, "active,closed")]
+        return self.boards[str(board_id)]
+
+    def resolve(self, sprint_ids, board_id=None):
+        """Sprints by ids in the same order. Unknown sprints are taken from the sprints list of `board_id`,
+        sprints of other boards - from the lists of their boards (a board is found by fetching one of its sprints)."""
+        sprint_ids = [int(sprint_id) for sprint_id in sprint_ids]
+        missing = [sprint_id for sprint_id in dict.fromkeys(sprint_ids)
+                   if sprint_id not in self.sprints and self._stored(sprint_id) is None]
+        offline = self.store is not None and self.store.offline
+        while missing and not offline:
+            sprint_id = missing[0]
+            self.board_sprints(board_id or self.get(sprint_id).board_id)
+            board_id = None
+            missing = [sprint_id for sprint_id in missing if sprint_id not in self.sprints]
+            if missing and missing[0] == sprint_id:
+                # not in the list of the board, e.g. a future sprint
+                self.get(missing.pop(0))
+        return [self.get(sprint_id) for sprint_id in sprint_ids]
+
+
+# the issue was added to the sprint or removed from it (`added` is False) at `time`
+ScopeChange = namedtuple("ScopeChange", ["time", "key", "added"])
+
+
+def get_sprint_scope_chart(sprint: JiraSprint, store=None):
+    """Greenhopper scope change chart of the sprint: changes of the sprint issues by timestamp."""
+    return get_json(
+        f"{JIRA.base_url}/rest/greenhopper/1.0/rapid/charts/scopechangeburndownchart?rapidViewId={sprint.board_id}&sprintId={sprint.sprint_id}",
+        store,
+        # the chart of a closed sprint doesn't change anymore
+        cacheable=lambda data: sprint.closed)
+
+
+def chart_issue_keys(chart: dict):
+    return set(value["key"] for values in chart["changes"].values() for value in values)
+
+
+def chart_scope_changes(chart: dict):
+    """Issues added to the sprint and removed from it, oldest first. Issues planned before the sprint start
+    are added at the start."""
+    changes = []
+    for timestamp, values in sorted(chart["changes"].items(), key=lambda item: int(item[0])):
+        time = datetime.fromtimestamp(int(timestamp) / 1000, timezone.utc)
+        # other changes (estimates, statuses) don't have `added`
+        changes += [ScopeChange(time, value["key"], value["added"]) for value in values if "added" in value]
+    return changes
+
+
+def scope_change_timeline(changes: [ScopeChange]):
+    """Times each issue was added to the sprint and removed from it: {key: {"added": [...], "removed": [...]}}."""
+    timeline = {}
+    for change in changes:
+        times = timeline.setdefault(change.key, {"added": [], "removed": []})
+        times["added" if change.added else "removed"].append(change.time)
+    return timeline
+
+
+def get_sprint_scope_changes(sprint: JiraSprint, store=None):
+    return chart_scope_changes(get_sprint_scope_chart(sprint, store))
+
+
+def get_issue_keys_from_sprint_greenhopper(sprint: JiraSprint, store=None):
+    """Get keys of all issues appeared in sprint according to Greenhopper log"""
+    return chart_issue_keys(get_sprint_scope_chart(sprint, store))
+
+
+def get_all_issues_from_sprint_greenhopper(sprint: JiraSprint, store=None, issues=None):
+    """Get all issues appeared in sprint according to Greenhopper log. Already fetched `issues` (by key)
+    are not fetched again."""
+    return get_jira_issues_by_keys(get_issue_keys_from_sprint_greenhopper(sprint, store), store, issues)
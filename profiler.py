@@ -0,0 +1,120 @@
+import json
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from urllib.parse import urlsplit
+
+LATENCY_PERCENTILES = (.5, .9, .99)
+
+
+def endpoint(url: str):
+    """Url path without ids and issue keys, e.g. /rest/api/2/issue/{id}/changelog."""
+    return re.sub(r"(?<!/api)/([A-Z][A-Z0-9_]*-\d+|\d+)(?=/|$)", "/{id}", urlsplit(url).path)
+
+
+def percentile(values: list, q: float):
+    """Linear interpolation between the closest ranks, the same as pandas does by default."""
+    values = sorted(values)
+    if not values:
+        return None
+    position = (len(values) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+class Profiler:
+    """Collects timings of spans (report sections, parsing), Jira requests, counters and cache hits of the run.
+    Disabled profiler does nothing, so hooks cost almost nothing when `--profile` isn't passed."""
+
+    def __init__(self):
+        self.enabled = False
+        self.started = time.perf_counter()
+        self.spans = {}
+        self.requests = {}
+        self.counters = {}
+        self.caches = {}
+        self._lock = threading.Lock()
+
+    def enable(self):
+        self.__init__()
+        self.enabled = True
+
+    def span(self, name: str):
+        return self._span(name) if self.enabled else nullcontext()
+
+    @contextmanager
+    def _span(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - started
+            with self._lock:
+                span = self.spans.setdefault(name, {"calls": 0, "seconds": 0.0})
+                span["calls"] += 1
+                span["seconds"] += seconds
+
+    def request(self, url: str, seconds: float, size: int, status: int):
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self.requests.setdefault(endpoint(url), {"latencies": [], "bytes": 0, "errors": 0})
+            stats["latencies"].append(seconds)
+            stats["bytes"] += size
+            stats["errors"] += status >= 400
+
+    def count(self, name: str, value=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def cache(self, name: str, hit: bool):
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self.caches.setdefault(name, {"hits": 0, "misses": 0})
+            stats["hits" if hit else "misses"] += 1
+
+    def summary(self):
+        def request_stats(latencies: list, size: int, errors: int):
+            return {
+                "count": len(latencies),
+                "bytes": size,
+                "errors": errors,
+                "seconds": round(sum(latencies), 3),
+                "latency": {f"p{int(q * 100)}": round(percentile(latencies, q), 4) for q in LATENCY_PERCENTILES},
+                "max_latency": round(max(latencies), 4),
+            }
+
+        all_latencies = [latency for stats in self.requests.values() for latency in stats["latencies"]]
+        return {
+            "wall_seconds": round(time.perf_counter() - self.started, 3),
+            "spans": {name: {"calls": span["calls"], "seconds": round(span["seconds"], 3)}
+                      for name, span in self.spans.items()},
+            "requests": {
+                "total": request_stats(all_latencies, sum(stats["bytes"] for stats in self.requests.values()),
+                                       sum(stats["errors"] for stats in self.requests.values()))
+                if all_latencies else {"count": 0},
+                "by_endpoint": {name: request_stats(stats["latencies"], stats["bytes"], stats["errors"])
+                                for name, stats in sorted(self.requests.items())},
+            },
+            "counters": dict(sorted(self.counters.items())),
+            "caches": {name: {**stats, "hit_rate": round(stats["hits"] / (stats["hits"] + stats["misses"]), 3)}
+                       for name, stats in sorted(self.caches.items())},
+        }
+
+    def write(self, path: str):
+        """Writes the summary as JSON to the file, or to stderr for `-`, so it doesn't mix with the report."""
+        summary = json.dumps(self.summary(), indent=2)
+        if path == "-":
+            print(summary, file=sys.stderr)
+        else:
+            with open(path, "w") as f:
+                f.write(summary + "\n")
+
+
+PROFILER = Profiler()
@@ -0,0 +1,152 @@
+import importlib.util
+import os
+import pandas as pd
+from metrics import *
+
+ISSUE_COLUMNS = ["PROJECT", "SPRINT", "KEY", "TYPE", "PRIORITY", "STATUS_CATEGORY", "SUMMARY", "STORY_POINTS",
+                 "RESOLVED", "IN_SPRINT", "COMPLETED", "SPRINT_GOAL", "COMMITTED", "UNPLANNED", "ROADMAP", "BUG",
+                 "TECH_DEBT", "OTHER", "LEAD_TIME", "CYCLE_TIME", "IN_REVIEW"]
+METRIC_COLUMNS = ["PROJECT", "SPRINT", "SECTION", "METRIC", "VALUE"]
+# issue flags by the sections setting them, the flags of sections which weren't collected are empty
+ISSUE_FLAGS = {
+    "goals": {"SPRINT_GOAL": "planned"},
+    "velocity": {"COMMITTED": "committed"},
+    "unplanned": {"UNPLANNED": "unplanned"},
+    "focus": {"ROADMAP": "roadmap", "BUG": "bugs", "TECH_DEBT": "tech debt", "OTHER": "other"},
+}
+DURATION_COLUMNS = {"lead time": "LEAD_TIME", "cycle time": "CYCLE_TIME", "in review": "IN_REVIEW"}
+FORMATS = ["json", "csv", "parquet"]
+
+
+def seconds(durations):
+    """Durations (timedelta column) as integer seconds, empty where there is no duration."""
+    return durations.dt.total_seconds().round().astype("Int64")
+
+
+def issue_rows(project: str, snapshot: SprintSnapshot, results: dict):
+    """One row per issue of the snapshot (the sprint issues and committed issues removed from the sprint)
+    with the flags of the sections they are counted in and their development time in seconds."""
+    if snapshot is None:
+        return pd.DataFrame(columns=ISSUE_COLUMNS)
+    issues = list(snapshot.issues.values())
+    sprint_keys = keys(snapshot.sprint_issues)
+    completed_keys = keys(snapshot.completed())
+    rows = pd.DataFrame({
+        "PROJECT": project,
+        "SPRINT": snapshot.sprint.sprint_id,
+        "KEY": [issue.key for issue in issues],
+        "TYPE": [issue.issue_type for issue in issues],
+        "PRIORITY": [issue.priority for issue in issues],
+        "STATUS_CATEGORY": [issue.status_category for issue in issues],
+        "SUMMARY": [issue.summary for issue in issues],
+        "STORY_POINTS": [float(issue.story_points) for issue in issues],
+        "RESOLVED": pd.to_datetime([issue.resolved for issue in issues]),
+        "IN_SPRINT": [issue.key in sprint_keys for issue in issues],
+        "COMPLETED": [issue.key in completed_keys for issue in issues],
+    }, columns=ISSUE_COLUMNS[:11])
+
+    for section, flags in ISSUE_FLAGS.items():
+        for column, name in flags.items():
+            if section in results:
+                flagged = keys(results[section][name])
+                rows[column] = pd.array([issue.key in flagged for issue in issues], dtype="boolean")
+            else:
+                rows[column] = pd.array([None] * len(issues), dtype="boolean")
+
+    for name, column in DURATION_COLUMNS.items():
+        if "development" in results:
+            table = results["development"][name]
+            rows[column] = rows.KEY.map(dict(zip(table.KEY, seconds(table[column])))).astype("Int64")
+        else:
+            rows[column] = pd.array([None] * len(issues), dtype="Int64")
+    return rows
+
+
+def section_metrics(section: str, result: dict):
+    """Aggregate metrics of the section results: (METRIC, VALUE) pairs, durations in seconds."""
+    if section == "goals":
+        return [("planned_count", len(result["planned"])), ("planned_sp", story_points(result["planned"])),
+                ("completed_count", len(result["completed"])), ("completed_sp", story_points(result["completed"]))]
+    if section == "development":
+        metrics = []
+        for name, column in DURATION_COLUMNS.items():
+            durations = result[name][column]
+            metrics.append((f"{column.lower()}_count", len(durations)))
+            for q, value in zip(PERCENTILES, percentiles(durations)):
+                metrics.append((f"{column.lower()}_p{int(q * 100)}",
+                                None if pd.isna(value) else round(value.total_seconds())))
+        return metrics
+    if section == "velocity":
+        committed, completed = story_points(result["committed"]), story_points(result["completed"])
+        return [("committed_count", len(result["committed"])), ("committed_sp", committed),
+                ("completed_count", len(result["completed"])), ("completed_sp", completed),
+                ("not_completed_count", len(result["not completed"])),
+                ("not_completed_sp", story_points(result["not completed"])),
+                ("completed_committed_ratio", round(completed / committed * 100, 2) if committed != 0 else None)]
+    if section == "unplanned":
+        completed, unplanned_sp = story_points(result["completed"]), story_points(result["unplanned"])
+        return [("completed_sp", completed), ("unplanned_count", len(result["unplanned"])),
+                ("unplanned_sp", unplanned_sp),
+                ("unplanned_completed_ratio", round(unplanned_sp / completed * 100, 2) if completed != 0 else None)]
+    if section == "focus":
+        return [(f"{name.replace(' ', '_')}_{metric}", value) for name, issues in result.items()
+                for metric, value in [("count", len(issues)), ("sp", story_points(issues))]]
+    if section == "defects":
+        return [("closed_medium_plus", result["closed"]), ("open_medium_plus", result["open"])]
+    raise ValueError(f"!!! unknown section {section}")
+
+
+def metric_rows(project: str, sprint_id, results: dict):
+    """Aggregate metrics of all sections in the long format: PROJECT, SPRINT, SECTION, METRIC, VALUE."""
+    rows = [(project, sprint_id, section, metric, value)
+            for section, result in results.items() for metric, value in section_metrics(section, result)]
+    metrics = pd.DataFrame(rows, columns=METRIC_COLUMNS)
+    metrics["SPRINT"] = metrics.SPRINT.astype("Int64")
+    metrics["VALUE"] = metrics.VALUE.astype("Float64")
+    return metrics
+
+
+def trend_rows(project: str, trend):
+    """Trend table with time percentiles in seconds instead of timedeltas."""
+    rows = trend.copy()
+    rows.insert(0, "PROJECT", project)
+    for column in rows.columns:
+        if pd.api.types.is_timedelta64_dtype(rows[column]):
+            rows[column] = seconds(rows[column])
+    return rows
+
+
+def table_json(table, path=None):
+    """Table as a JSON list of rows, written to the file or returned as a string without `path`."""
+    return table.to_json(path, orient="records", date_format="iso", force_ascii=False, indent=2)
+
+
+def write_table(table, path: str, file_format: str):
+    if file_format == "json":
+        table_json(table, path)
+    elif file_format == "csv":
+        table.to_csv(path, index=False)
+    elif file_format == "parquet":
+        if importlib.util.find_spec("pyarrow") is None:
+            raise ValueError("!!! Parquet output needs pyarrow: pip install pyarrow")
+        table.to_parquet(path, index=False)
+    else:
+        raise ValueError(f"!!! unknown format {file_format}, choose from: {', '.join(FORMATS)}")
+
+
+def write_tables(tables: dict, directory: str, file_format: str):
+    """Writes each table to `<name>.<format>` in the directory, returns paths of the files."""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for name, table in tables.items():
+        paths.append(os.path.join(directory, f"{name}.{file_format}"))
+        write_table(table, paths[-1], file_format)
+    return paths
+
+
+def write_sprint_results(project: str, sprint_id, snapshot, results: dict, directory: str, file_format: str):
+    """Per-issue rows and aggregate metrics of the sprint report, named by the project and sprint,
+    so reports of many sprints can be written to one directory and loaded at once."""
+    suffix = project if sprint_id is None else f"{project}_{sprint_id}"
+    return write_tables({f"issues_{suffix}": issue_rows(project, snapshot, results),
+                         f"metrics_{suffix}": metric_rows(project, sprint_id, results)}, directory, file_format)
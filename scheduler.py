@@ -0,0 +1,108 @@
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from profiler import PROFILER
+
+RETRIES = 5
+# seconds of the first retry delay, it's doubled for every next retry
+BACKOFF = 1.0
+MAX_BACKOFF = 60.0
+
+
+def is_retryable(status_code: int):
+    """Jira throttles with 429, 5xx responses are usually temporary too."""
+    return status_code == 429 or status_code >= 500
+
+
+def retry_after(response):
+    """Seconds from the Retry-After header (a number or an HTTP date), None if there is no header."""
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class RequestScheduler:
+    """All Jira requests of the run go through it, from any thread. It keeps not more than `limit` requests
+    in flight and not more than `rps` requests per second (if passed).
+
+    Throttled (429) and failed (5xx, connection errors) requests are retried after Retry-After or a jittered
+    exponential backoff, while the other requests wait too. The limit adapts like in TCP (AIMD): it's halved
+    on throttling and grows back by one per `limit` successful requests, up to `max_concurrency`."""
+
+    def __init__(self, max_concurrency: int, rps=None, retries=RETRIES, backoff=BACKOFF, max_backoff=MAX_BACKOFF):
+        self.max_concurrency = max_concurrency
+        self.limit = float(max_concurrency)
+        self.rps = rps
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.in_flight = 0
+        # the earliest time of the next request: by the rps cap or after Retry-After
+        self.next_request_at = time.monotonic()
+        self._condition = threading.Condition()
+
+    def _acquire(self):
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+            now = time.monotonic()
+            request_at = max(now, self.next_request_at)
+            if self.rps:
+                self.next_request_at = request_at + 1 / self.rps
+        if request_at > now:
+            time.sleep(request_at - now)
+
+    def _release(self, throttled: bool):
+        with self._condition:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(1.0, self.limit / 2)
+            else:
+                self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+    def _pause(self, seconds: float):
+        """Nobody sends requests for `seconds`, e.g. when Jira asked to retry after them."""
+        with self._condition:
+            self.next_request_at = max(self.next_request_at, time.monotonic() + seconds)
+
+    def request(self, send):
+        """Calls `send()` (it sends one request and returns the response) with retries. Returns the last response
+        if all retries failed, raises the connection error if the last attempt couldn't connect."""
+        for attempt in range(self.retries + 1):
+            self._acquire()
+            response, error = None, None
+            try:
+                response = send()
+            except OSError as e:
+                # requests exceptions are OSError too
+                error = e
+            finally:
+                self._release(throttled=response is not None and response.status_code == 429)
+            if response is not None and not is_retryable(response.status_code):
+                return response
+            if attempt == self.retries:
+                if error is not None:
+                    raise error
+                return response
+
+            delay = None if response is None else retry_after(response)
+            if delay is not None:
+                self._pause(delay)
+            else:
+                delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+            PROFILER.count("retries")
+            if response is not None and response.status_code == 429:
+                PROFILER.count("throttled responses")
+            time.sleep(delay)
@@ -1,41 +1,62 @@
-from datetime import datetime
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 import argparse
-import pandas as pd
 from my_jira import *
-from my_jira import JIRA_CLIENT
+from sprint_snapshot import *
+from metrics import *
+from issue_store import IssueStore, DEFAULT_STORE_PATH, DEFAULT_TTL
 from helpers import timedelta_formatter
-
-parser = argparse.ArgumentParser(description="Team sprint metrics. ",
-                                 formatter_class=argparse.ArgumentDefaultsHelpFormatter)
-parser.add_argument("-s", "--sprint", type=str, help="Pass the sprint id")
-parser.add_argument("-p", "--project", type=str, help="Pass the project key")
-args = parser.parse_args()
-
-PROJECT_ID = args.project
-SPRINT_ID = args.sprint
-
-SPRINT = JiraSprint(SPRINT_ID)
-print(f"\n{'*' * 100}\n'{PROJECT_ID}' PROJECT STATISTICS FOR SPRINT {SPRINT.sprint_id} '{SPRINT.name}' "
-      f"(time: '{str(datetime.now())}):")
-
-
-def sprint_goals_completion(project: str, sprint_id: str):
-    sprint = JiraSprint(sprint_id)
+from profiler import PROFILER
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Team sprint metrics. ",
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("-s", "--sprint", type=str, help="Pass the sprint id")
+    parser.add_argument("-p", "--project", type=str, help="Pass the project key")
+    parser.add_argument("--sprints", type=str,
+                        help="Trend for several sprints: ids and ranges of ids of one board, e.g. 101,105-120")
+    parser.add_argument("-b", "--board", type=str, help="Pass the board id to take sprints from (with --last)")
+    parser.add_argument("--last", type=int, help="Trend for the last N closed sprints of the board")
+    parser.add_argument("--workers", type=int, default=1, help="Processes to compute the sprint trend in parallel")
+    parser.add_argument("--store", type=str, nargs="?", const=DEFAULT_STORE_PATH,
+                        help=f"Keep the project issues in a local store file ({DEFAULT_STORE_PATH} if no file) "
+                             f"and sync them incrementally, instead of fetching only the sprint issues from Jira")
+    parser.add_argument("--ttl", type=int, default=int(DEFAULT_TTL.total_seconds() // 60),
+                        help="Minutes after the last sync while the local store is considered fresh")
+    parser.add_argument("--refresh", action="store_true", help="Download all issues of the project to the store again")
+    parser.add_argument("--offline", action="store_true", help="Use only the local store, don't go to Jira")
+    parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENCY, help="Max parallel requests to Jira")
+    parser.add_argument("--sections", type=str, default=",".join(SECTIONS),
+                        help=f"Sections of the sprint report to collect, some of: {', '.join(SECTIONS)}")
+    parser.add_argument("--rps", type=float, help="Max requests per second to Jira (not limited by default)")
+    parser.add_argument("--profile", type=str, nargs="?", const="-",
+                        help="Write timings, requests and cache hits of the run as JSON to the file (stderr if no file)")
+    parser.add_argument("-f", "--format", type=str, choices=["text", "json", "csv", "parquet"], default="text",
+                        help="Print the text report or write per-issue rows and metrics to files of the format")
+    parser.add_argument("-o", "--output", type=str, default="results", help="Output directory of --format files")
+    args = parser.parse_args(argv)
+    if (args.offline or args.refresh) and args.store is None:
+        parser.error("--offline and --refresh need --store")
+    if args.sprint is not None and (args.sprints is not None or args.last is not None):
+        parser.error("pass either --sprint for one sprint or --sprints/--last for the trend")
+    if args.sprints is not None and args.last is not None:
+        parser.error("pass either --sprints or --last")
+    if args.last is not None and args.board is None:
+        parser.error("--last needs --board")
+    args.sections = [section.strip() for section in args.sections.split(",") if section.strip()]
+    unknown = [section for section in args.sections if section not in SECTIONS]
+    if unknown:
+        parser.error(f"unknown sections: {', '.join(unknown)}, choose from: {', '.join(SECTIONS)}")
+    if args.sprint is None and args.sprints is None and args.last is None and "snapshot" in plan_fetch(args.sections):
+        parser.error(f"pass --sprint (or --sprints/--last for the trend) for sections: {', '.join(args.sections)}")
+    return args
+
+
+def sprint_goals_completion(snapshot: SprintSnapshot, goals: dict):
     print(f"\n{'-' * 100}\nSPRINT GOALS COMPLETION:")
-    sprint_goals_planned = get_jira_issues_by_jql(
-        f"project = {project} and "
-        f"sprint = {sprint_id} and "
-        f"labels = sprint_goals",
-        JIRA_CLIENT
-    )
-    sprint_goals_completed = get_jira_issues_by_jql(
-        f"project = {project} and "
-        f"sprint = {sprint_id} and "
-        f"labels = sprint_goals and "
-        f"resolved >= {sprint.start} and "
-        f"resolved < {sprint.end}",
-        JIRA_CLIENT
-    )
+    sprint_goals_planned = goals["planned"]
+    sprint_goals_completed = goals["completed"]
 
     print(f"{len(sprint_goals_planned)} planned sprint goal(s):")
     for sprint_goal_planned in sprint_goals_planned:
@@ -46,127 +67,94 @@ def sprint_goals_completion(project: str, sprint_id: str):
         print(f"    {sprint_goal_completed.key} ({sprint_goal_completed.issue_type}), SP={sprint_goal_completed.story_points} '{sprint_goal_completed.summary}'")
 
 
-def development_time(project_id: str, sprint_id: str):
+def development_time(snapshot: SprintSnapshot, tables: dict):
     print(f"\n{'-' * 100}\nDEVELOPMENT TIME:")
-    sprint = JiraSprint(sprint_id)
-    percentile_interpolation = "linear"
+    sprint = snapshot.sprint
+    # JQL equivalents of the local filters are kept for the report headers
     lead_time_jql = \
-        f"Project = {project_id} and " \
+        f"Project = {snapshot.project} and " \
         f"Sprint = {sprint.sprint_id} and " \
         f"priority in (Critical,High) and " \
         f"type = Story and " \
         f"resolved >= {sprint.start} and " \
         f"resolved < {sprint.end} and " \
         f"statusCategory = Done"
-    lead_time_issues = get_jira_issues_by_jql(lead_time_jql, JIRA_CLIENT)
-    for issue in lead_time_issues:
-        issue.count_development_time()
-
-    lead_time = pd.DataFrame(
-        [(issue.key, issue.issue_type, f"{issue.summary[:20]}", issue.development_time["lead time"]) for issue in lead_time_issues],
-        columns=["KEY", "TYPE", "SUMMARY", "LEAD_TIME"]
-    )
-    lead_time.sort_values(by="LEAD_TIME", inplace=True, ascending=False)
-    print(f"\nLead time ({lead_time_jql}),\n"
-          "50th, 80th, 90th Percentiles:\n",
-          timedelta_formatter(lead_time.LEAD_TIME.quantile(.5, interpolation=percentile_interpolation)), "/",
-          timedelta_formatter(lead_time.LEAD_TIME.quantile(.8, interpolation=percentile_interpolation)), "/",
-          timedelta_formatter(lead_time.LEAD_TIME.quantile(.9, interpolation=percentile_interpolation)), "\n",
-          lead_time)
-
     cycle_and_in_review_time_jql = \
-        f"Project = {project_id} and " \
+        f"Project = {snapshot.project} and " \
         f"Sprint = {sprint.sprint_id} and " \
         f"resolved >= {sprint.start} and " \
         f"resolved < {sprint.end} and " \
         f"statusCategory = Done"
-    cycle_and_in_review_time_issues = get_jira_issues_by_jql(cycle_and_in_review_time_jql, JIRA_CLIENT)
-    for issue in cycle_and_in_review_time_issues:
-        issue.count_development_time()
-
-    cycle_time = pd.DataFrame(
-        [(issue.key, issue.issue_type, f"{issue.summary[:20]}", issue.development_time["cycle time"]) for issue in cycle_and_in_review_time_issues],
-        columns=["KEY", "TYPE", "SUMMARY", "CYCLE_TIME"]
-    )
-    cycle_time.sort_values(by="CYCLE_TIME", inplace=True, ascending=False)
+
+    lead_time = tables["lead time"]
+    print(f"\nLead time ({lead_time_jql}),\n"
+          "50th, 80th, 90th Percentiles:\n",
+          " / ".join(str(timedelta_formatter(value)) for value in percentiles(lead_time.LEAD_TIME)), "\n",
+          lead_time)
+
+    cycle_time = tables["cycle time"]
     print(f"\nCycle time ({cycle_and_in_review_time_jql}),\n"
           "50th, 80th, 90th Percentiles:\n",
-          timedelta_formatter(cycle_time.CYCLE_TIME.quantile(.5, interpolation=percentile_interpolation)), "/",
-          timedelta_formatter(cycle_time.CYCLE_TIME.quantile(.8, interpolation=percentile_interpolation)), "/",
-          timedelta_formatter(cycle_time.CYCLE_TIME.quantile(.9, interpolation=percentile_interpolation)), "\n",
+          " / ".join(str(timedelta_formatter(value)) for value in percentiles(cycle_time.CYCLE_TIME)), "\n",
           cycle_time)
 
-    in_review_time = pd.DataFrame(
-        [(issue.key, issue.issue_type, f"{issue.summary[:20]}", issue.development_time["in review"]) for issue in cycle_and_in_review_time_issues],
-        columns=["KEY", "TYPE", "SUMMARY", "IN_REVIEW"]
-    )
-    in_review_time.sort_values(by="IN_REVIEW", inplace=True, ascending=False)
+    in_review_time = tables["in review"]
     print(f"\nIn Review time ({cycle_and_in_review_time_jql}), "
           "50th, 80th, 90th Percentiles:\n",
-          timedelta_formatter(in_review_time.IN_REVIEW.quantile(.5, interpolation=percentile_interpolation)), "/",
-          timedelta_formatter(in_review_time.IN_REVIEW.quantile(.8, interpolation=percentile_interpolation)), "/",
-          timedelta_formatter(in_review_time.IN_REVIEW.quantile(.9, interpolation=percentile_interpolation)), "\n",
+          " / ".join(str(timedelta_formatter(value)) for value in percentiles(in_review_time.IN_REVIEW)), "\n",
           in_review_time)
 
 
-def team_velocity(project: str, sprint_id: str):
+def team_velocity(snapshot: SprintSnapshot, velocity: dict):
     print(f"\n{'-' * 100}\nTEAM VELOCITY:")
-    sprint = JiraSprint(sprint_id)
-    issues_committed = get_all_issues_from_sprint_greenhopper(sprint_id, sprint.board_id)
+    sprint = snapshot.sprint
+    issues_committed = velocity["committed"]
     print("Issues committed: ")
     for issue in issues_committed:
         print(f"    {issue.key} ({issue.issue_type}), SP={issue.story_points} '{issue.summary}'")
 
     issues_completed_jql = \
-        f"project = {project} and " \
-        f"sprint = {sprint_id} and " \
+        f"project = {snapshot.project} and " \
+        f"sprint = {sprint.sprint_id} and " \
         f"resolved >= {sprint.start} and " \
         f"resolved < {sprint.end}"
-    issues_completed = get_jira_issues_by_jql(issues_completed_jql, JIRA_CLIENT)
+    issues_completed = velocity["completed"]
     print("Issues completed: ", issues_completed_jql)
     for issue in issues_completed:
         print(f"    {issue.key} ({issue.issue_type}), SP={issue.story_points} '{issue.summary}'")
 
-    issues_not_completed = [issue for issue in issues_committed if
-                            issue.key not in [issue.key for issue in issues_completed]]
     print("Issues not completed: ", )
-    for issue in issues_not_completed:
+    for issue in velocity["not completed"]:
         print(f"    {issue.key} ({issue.issue_type}), SP={issue.story_points} '{issue.summary}'")
 
-    committed_story_points = sum([issue.story_points for issue in issues_committed])
-    completed_story_points = sum([issue.story_points for issue in issues_completed])
+    committed_story_points = story_points(issues_committed)
+    completed_story_points = story_points(issues_completed)
     print(f"Committed story points: {committed_story_points}")
     print(f"Completed story points: {completed_story_points}")
     if committed_story_points != 0:
         print(f"Completed/committed ratio: {round(completed_story_points / committed_story_points * 100, 2)}%")
 
 
-def unplanned_work(project: str, sprint_id: str):
-    sprint = JiraSprint(sprint_id)
+def unplanned_work(snapshot: SprintSnapshot, work: dict):
     print(f"\n{'-' * 100}\nUNPLANNED WORK:")
-    issues_completed_jql = \
-        f"project = {project} and " \
-        f"sprint = {sprint_id} and " \
-        f"resolved >= {sprint.start} and " \
-        f"resolved < {sprint.end}"
-    issues_completed = get_jira_issues_by_jql(issues_completed_jql, JIRA_CLIENT)
-    issues_unplanned = []
-    for issue in issues_completed:
-        if issue.linked_pi_up_issues:
-            issues_unplanned.append(issue)
-            print(f"    Issue {issue.key} ({issue.issue_type}) '{issue.summary}'"
-                  f"\n        has linked UP/PI ticket(s): {issue.linked_pi_up_issues}")
-
-    completed_story_points = sum([issue.story_points for issue in issues_completed])
-    unplanned_story_points = sum([issue.story_points for issue in issues_unplanned])
+    issues_completed = work["completed"]
+    issues_unplanned = work["unplanned"]
+    for issue in issues_unplanned:
+        print(f"    Issue {issue.key} ({issue.issue_type}) '{issue.summary}'"
+              f"\n        has linked UP/PI ticket(s): {issue.linked_pi_up_issues}")
+
+    completed_story_points = story_points(issues_completed)
+    unplanned_story_points = story_points(issues_unplanned)
     print(f"All completed issues story points: {completed_story_points}")
     print(f"Unplanned work story points: {unplanned_story_points}")
     if completed_story_points != 0:
         print(f"Unplanned/completed ratio: {round(unplanned_story_points / completed_story_points * 100, 2)}%")
 
 
-def focus_structure(project: str, sprint_id: str):
-    sprint = JiraSprint(sprint_id)
+def focus_structure(snapshot: SprintSnapshot, focus: dict):
+    sprint = snapshot.sprint
+    project = snapshot.project
+    sprint_id = sprint.sprint_id
     print(f"\n{'-' * 100}\nFOCUS STRUCTURE")
 
     issues_completed_jql = \
@@ -174,111 +162,183 @@ def focus_structure(project: str, sprint_id: str):
         f"sprint = {sprint_id} and " \
         f"resolved >= {sprint.start} and " \
         f"resolved < {sprint.end}"
-    issues_completed = get_jira_issues_by_jql(issues_completed_jql, JIRA_CLIENT)
-    completed_story_points = sum([issue.story_points for issue in issues_completed])
-
-    unplanned_issues = []
-    for issue in issues_completed:
-        if issue.linked_pi_up_issues:
-            unplanned_issues.append(issue)
-    unplanned_story_points = sum([issue.story_points for issue in unplanned_issues])
-
     bugs_resolved_jql = \
         f"project = {project} and " \
         f"type = bug and " \
         f"sprint = {sprint_id} and " \
-        f"resolved > {sprint.start} and " \
+        f"resolved >= {sprint.start} and " \
         f"resolved < {sprint.end}"
-    bugs_resolved_with_unplanned = get_jira_issues_by_jql(bugs_resolved_jql, JIRA_CLIENT)
-    # now let's exclude bugs which are linked to PI or UP tickets, because they are already in Unplanned issues stats
-    bugs_resolved = []
-    for bug in bugs_resolved_with_unplanned:
-        if bug.key not in [unplanned_issue.key for unplanned_issue in unplanned_issues]:
-            bugs_resolved.append(bug)
-
-    bugs_resolved_story_points = sum([issue.story_points for issue in bugs_resolved])
     roadmap_completed_jql = \
         f"project = {project} and " \
         f"labels = roadmap and " \
         f"sprint = {sprint_id} and " \
         f"resolved >= {sprint.start} and " \
         f"resolved < {sprint.end}"
-    roadmap_completed = get_jira_issues_by_jql(roadmap_completed_jql, JIRA_CLIENT)
-    roadmap_completed_story_points = sum([issue.story_points for issue in roadmap_completed])
-
     tech_debt_closed_jql = \
         f"project = {project} and " \
         f"(labels in (techdebt, tech_debt, tech) or summary ~ 'tech' or summary ~ 'Tech') and " \
         f"sprint = {sprint_id} and " \
         f"resolved >= {sprint.start} and " \
         f"resolved < {sprint.end}"
-    tech_debt_closed = get_jira_issues_by_jql(tech_debt_closed_jql, JIRA_CLIENT)
-    tech_debt_closed_story_points = sum([issue.story_points for issue in tech_debt_closed])
-
-    other_issues_closed = []
-    for issue in issues_completed:
-        if issue.key not in set(
-            [unplanned_issue.key for unplanned_issue in unplanned_issues] + \
-            [bug.key for bug in bugs_resolved] + \
-            [tech_debt.key for tech_debt in tech_debt_closed] + \
-            [roadmap.key for roadmap in roadmap_completed]
-    ):
-            other_issues_closed.append(issue)
-    other_issues_closed_story_points = sum([issue.story_points for issue in other_issues_closed])
 
     print(f"All completed issues: {issues_completed_jql} \n    "
-          f"count={len(issues_completed)}, SP={completed_story_points}")
-    print(f"Unplanned issues: \n    count={len(unplanned_issues)}, SP={unplanned_story_points}")
-    for unplanned_issue in unplanned_issues:
+          f"count={len(focus['completed'])}, SP={story_points(focus['completed'])}")
+    print(f"Unplanned issues: \n    count={len(focus['unplanned'])}, SP={story_points(focus['unplanned'])}")
+    for unplanned_issue in focus["unplanned"]:
         print(f"    Issue {unplanned_issue.key} ({unplanned_issue.issue_type}) '{unplanned_issue.summary}'"
               f"\n          has linked UP/PI ticket(s): {unplanned_issue.linked_pi_up_issues}")
 
     print(f"Roadmap issues completed: {roadmap_completed_jql} \n    "
-          f"count={len(roadmap_completed)}, SP={roadmap_completed_story_points}")
-    for roadmap_issue in roadmap_completed:
+          f"count={len(focus['roadmap'])}, SP={story_points(focus['roadmap'])}")
+    for roadmap_issue in focus["roadmap"]:
         print(f"    {roadmap_issue.key} ({roadmap_issue.issue_type}), "
               f"SP={roadmap_issue.story_points} '{roadmap_issue.summary}'")
 
     print(f"Bugs resolved (without linked to PI or UP): {bugs_resolved_jql} \n"
-          f"    count={len(bugs_resolved)}, SP={bugs_resolved_story_points}")
-    for bug in bugs_resolved:
+          f"    count={len(focus['bugs'])}, SP={story_points(focus['bugs'])}")
+    for bug in focus["bugs"]:
         print(f"    {bug.key}, SP={bug.story_points} '{bug.summary}'")
 
     print(f"Tech debt closed: {tech_debt_closed_jql} \n"
-          f"    count={len(tech_debt_closed)}, SP={tech_debt_closed_story_points}")
-    for tech_debt in tech_debt_closed:
+          f"    count={len(focus['tech debt'])}, SP={story_points(focus['tech debt'])}")
+    for tech_debt in focus["tech debt"]:
         print(f"    {tech_debt.key} ({tech_debt.issue_type}), SP={tech_debt.story_points} '{tech_debt.summary}'")
 
-    print(f"Other issues closed: \n    count={len(other_issues_closed)}, SP={other_issues_closed_story_points}")
-    for issue in other_issues_closed:
+    print(f"Other issues closed: \n    count={len(focus['other'])}, SP={story_points(focus['other'])}")
+    for issue in focus["other"]:
         print(f"    {issue.key} ({issue.issue_type}), SP={issue.story_points} '{issue.summary}'")
 
 
-def defect_dynamics(project: str):
+def defect_dynamics(snapshot: SprintSnapshot, bugs: dict):
     print(f"\n{'-' * 100}\nDEFECT DYNAMICS:")
-    bugs_closed = get_jira_issues_by_jql(
-        f"project = {project} and "
-        f"type = bug and "
-        f"priority != low and "
-        f"statusCategory = Done",
-        JIRA_CLIENT
-    )
-    bugs_open = get_jira_issues_by_jql(
-        f"project = {project} and "
-        f"type = bug and "
-        f"priority != low and "
-        f"statusCategory != Done",
-        JIRA_CLIENT
-    )
-
-    print(f"    Closed (Medium+): {len(bugs_closed)}\n"
-          f"    Remaining (Medium+): {len(bugs_open)}")
+    print(f"    Closed (Medium+): {bugs['closed']}\n"
+          f"    Remaining (Medium+): {bugs['open']}")
+
+
+# report sections in the order of the report: the function computing the section results, the text renderer
+# of the results and data the section needs: "snapshot" - issues of the sprint, "changelog" - their changelogs,
+# "committed" - Greenhopper chart with issues committed to the sprint, "project" - issues of the whole project
+SECTIONS = {
+    "goals": (sprint_goals_issues, sprint_goals_completion, {"snapshot"}),
+    "development": (development_time_tables, development_time, {"snapshot", "changelog"}),
+    "velocity": (velocity_issues, team_velocity, {"snapshot", "committed"}),
+    "unplanned": (unplanned_work_issues, unplanned_work, {"snapshot"}),
+    "focus": (focus_structure_issues, focus_structure, {"snapshot"}),
+    "defects": (defect_counts, defect_dynamics, {"project"}),
+}
+
+
+def plan_fetch(sections: [str]):
+    """All data needed for the sections, so it's fetched once and nothing else is fetched."""
+    return set().union(*[SECTIONS[section][2] for section in sections])
+
+
+def sprint_results(project_id: str, sprint_id: str, sections: [str], store=None, registry=None):
+    """Fetches data the sections need and computes the sections in parallel (while the snapshot is fetched,
+    sections which don't need it are already computed). Returns the snapshot (None if no section needs it)
+    and results of the sections in the order of the report."""
+    plan = plan_fetch(sections)
+    sections = [section for section in SECTIONS if section in sections]
+    with ThreadPoolExecutor(max_workers=len(sections) + 1) as executor:
+        snapshot = None
+        if "snapshot" in plan:
+            with PROFILER.span("sprints"):
+                sprint = (registry or SprintRegistry(store)).get(sprint_id)
+
+            def take_snapshot():
+                with PROFILER.span("snapshots"):
+                    return SprintSnapshot(project_id, sprint, store, changelog="changelog" in plan,
+                                          committed="committed" in plan)
+
+            snapshot = executor.submit(take_snapshot)
+
+        def compute(section: str):
+            function, _, needs = SECTIONS[section]
+            arguments = [snapshot.result()] if "snapshot" in needs else [project_id, store]
+            with PROFILER.span(f"section: {function.__name__}"):
+                return function(*arguments)
+
+        results = {section: executor.submit(compute, section) for section in sections}
+        return (snapshot and snapshot.result()), {section: result.result() for section, result in results.items()}
+
+
+def print_sprint_report(project_id: str, snapshot, results: dict):
+    """The text renderer of the sections results."""
+    if snapshot is not None:
+        sprint = snapshot.sprint
+        print(f"\n{'*' * 100}\n'{project_id}' PROJECT STATISTICS FOR SPRINT {sprint.sprint_id} '{sprint.name}' "
+              f"(time: '{str(datetime.now())}):")
+    else:
+        print(f"\n{'*' * 100}\n'{project_id}' PROJECT STATISTICS (time: '{str(datetime.now())}):")
+    for section, result in results.items():
+        SECTIONS[section][1](snapshot, result)
+
+
+def trend_sprints(sprints: str, board_id: str, last: int, registry: SprintRegistry):
+    """Sprints from `--sprints` ids and ranges, or the last N closed sprints of the board."""
+    if sprints is None:
+        board_sprints = [sprint for sprint in registry.board_sprints(board_id) if sprint.closed]
+        return sorted(board_sprints, key=lambda sprint: sprint.end_time)[-last:]
+
+    sprint_ids = []
+    for part in sprints.split(","):
+        if "-" in part:
+            first_id, last_id = [int(sprint_id) for sprint_id in part.split("-")]
+            # ids of a board's sprints are not consecutive, so ranges are taken from the board sprints list
+            board_sprints = registry.board_sprints(board_id or registry.get(first_id).board_id)
+            sprint_ids += [sprint.sprint_id for sprint in board_sprints
+                           if sprint.closed and first_id <= sprint.sprint_id <= last_id]
+        else:
+            sprint_ids.append(int(part))
+    # sprints passed by ids are resolved at once with the sprints lists of their boards
+    return registry.resolve(sprint_ids, board_id)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.profile is not None:
+        PROFILER.enable()
+    connect(max_concurrency=args.concurrency, rps=args.rps)
+    project_id = args.project
+    store = None if args.store is None else \
+        IssueStore(args.store, ttl=timedelta(minutes=args.ttl), refresh=args.refresh, offline=args.offline)
+    trend = args.sprints is not None or args.last is not None
+    # project-wide sections only count issues in Jira, so the store is synced only for the sprint issues
+    if store is not None and (trend or "snapshot" in plan_fetch(args.sections)):
+        with PROFILER.span("store sync"):
+            store.sync_project(project_id)
+    registry = SprintRegistry(store)
+
+    if trend:
+        # imports pandas, so it's imported only when needed
+        from sprint_trend import sprint_trend, print_sprint_trend
+        with PROFILER.span("sprints"):
+            sprints = trend_sprints(args.sprints, args.board, args.last, registry)
+        with PROFILER.span("snapshots"):
+            snapshots = fetch_sprint_snapshots(project_id, sprints, store)
+        with PROFILER.span("section: sprint trend"):
+            trend = sprint_trend(snapshots, args.workers)
+        if args.format == "text":
+            print(f"\n{'*' * 100}\n'{project_id}' PROJECT TREND FOR {len(sprints)} SPRINTS "
+                  f"(time: '{str(datetime.now())}):")
+            print_sprint_trend(trend)
+        else:
+            from results import trend_rows, write_tables
+            paths = write_tables({f"trend_{project_id}": trend_rows(project_id, trend)}, args.output, args.format)
+            print(f"Saved trend to {', '.join(paths)}")
+    else:
+        snapshot, results = sprint_results(project_id, args.sprint, args.sections, store, registry)
+        if args.format == "text":
+            print_sprint_report(project_id, snapshot, results)
+        else:
+            # imports pandas, so it's imported only when needed
+            from results import write_sprint_results
+            paths = write_sprint_results(project_id, args.sprint, snapshot, results, args.output, args.format)
+            print(f"Saved results to {', '.join(paths)}")
+
+    if args.profile is not None:
+        PROFILER.write(args.profile)
 
 
 if __name__ == "__main__":
-    sprint_goals_completion(PROJECT_ID, SPRINT_ID)
-    development_time(PROJECT_ID, SPRINT_ID)
-    team_velocity(PROJECT_ID, SPRINT_ID)
-    unplanned_work(PROJECT_ID, SPRINT_ID)
-    focus_structure(PROJECT_ID, SPRINT_ID)
-    defect_dynamics(PROJECT_ID)
+    main()
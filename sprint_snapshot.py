@@ -0,0 +1,140 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+import my_jira
+from profiler import PROFILER
+from my_jira import JiraIssue, JiraSprint, get_jira_issues_by_jql, get_jira_issues_by_keys, get_sprint_scope_chart, \
+    chart_issue_keys, chart_scope_changes, scope_change_timeline
+
+
+class SprintSnapshot:
+    """All issues of the sprint fetched once. Report sections filter them locally with predicates below
+    instead of sending their own JQL queries."""
+
+    def __init__(self, project: str, sprint: JiraSprint, store=None, issues=None, scope_chart=None,
+                 changelog=True, committed=True):
+        """With the local `store` the issues are taken from it (the project should be synced before).
+        `issues` (by key) and the Greenhopper `scope_chart` are passed when issues of several sprints are fetched
+        at once, see `fetch_sprint_snapshots`. Without `changelog` development time can't be counted,
+        without `committed` the Greenhopper chart isn't fetched, so committed issues and scope changes are None."""
+        self.project = project
+        self.sprint = sprint
+        self.scope_changes = None
+        self.committed_issues = None
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            chart = None
+            if committed and scope_chart is None:
+                # the chart is fetched while the sprint issues are fetched
+                chart = executor.submit(get_sprint_scope_chart, sprint, store)
+            if issues is not None:
+                self.sprint_issues = [issue for issue in issues.values()
+                                      if issue.project == project and int(sprint.sprint_id) in issue.sprint_ids]
+            elif store is None:
+                # the same order as Jira returns for each section's own JQL, so printed lists don't change
+                self.sprint_issues = get_jira_issues_by_jql(
+                    f"project = {project} and sprint = {sprint.sprint_id}", changelog=changelog)
+            else:
+                self.sprint_issues = store.sprint_issues(project, sprint.sprint_id)
+            if chart is not None:
+                scope_chart = chart.result()
+        self.issues = {issue.key: issue for issue in self.sprint_issues}
+        if not committed:
+            return
+
+        # ScopeChange of issues added to the sprint and removed from it, oldest first
+        self.scope_changes = chart_scope_changes(scope_chart)
+        # issues committed to the sprint, but removed from it or belonging to other projects
+        committed_keys = chart_issue_keys(scope_chart)
+        self.committed_issues = [issue for issue in self.sprint_issues if issue.key in committed_keys]
+        # only story points of them are needed
+        for issue in resolve_issues(committed_keys - self.issues.keys(), store, issues, changelog=False):
+            self.issues[issue.key] = issue
+            self.committed_issues.append(issue)
+
+    def scope_timeline(self):
+        """Times each issue was added to the sprint and removed from it: {key: {"added": [...], "removed": [...]}}."""
+        return scope_change_timeline(self.scope_changes)
+
+    def select(self, *predicates):
+        """Sprint issues matching all predicates (the same as `and` in JQL)."""
+        return [issue for issue in self.sprint_issues if all(predicate(issue) for predicate in predicates)]
+
+    def completed(self, *predicates):
+        """Sprint issues resolved during the sprint and matching all predicates."""
+        return self.select(resolved_between(self.sprint.start_time, self.sprint.end_time), *predicates)
+
+
+def resolve_issues(issue_keys: set, store=None, issues=None, changelog=True):
+    """Issues by keys: from already fetched `issues`, then from the local store, then from Jira."""
+    issue_keys = set(issue_keys)
+    resolved = []
+    if issues is not None:
+        resolved += [issues[key] for key in sorted(issue_keys) if key in issues]
+        PROFILER.count("resolved issues: fetched before", len(resolved))
+        issue_keys -= keys(resolved)
+    if issue_keys and store is not None:
+        stored = store.get_issues(issue_keys)
+        PROFILER.count("resolved issues: local store", len(stored))
+        resolved += stored
+        issue_keys -= keys(resolved)
+    if issue_keys and (store is None or not store.offline):
+        PROFILER.count("resolved issues: Jira", len(issue_keys))
+        resolved += get_jira_issues_by_keys(issue_keys, store, changelog=changelog)
+    return resolved
+
+
+def fetch_sprint_snapshots(project: str, sprints: [JiraSprint], store=None):
+    """Snapshots of several sprints sharing the same fetched issues, so issues carried over from sprint
+    to sprint are downloaded once."""
+    sprint_ids = [sprint.sprint_id for sprint in sprints]
+    if store is None:
+        issues = get_jira_issues_by_jql(
+            f"project = {project} and sprint in ({', '.join(str(sprint_id) for sprint_id in sprint_ids)})")
+    else:
+        issues = store.sprint_issues(project, *sprint_ids)
+    issues = {issue.key: issue for issue in issues}
+
+    with ThreadPoolExecutor(max_workers=my_jira.JIRA.max_concurrency) as executor:
+        charts = list(executor.map(lambda sprint: get_sprint_scope_chart(sprint, store), sprints))
+    # issues committed to any of the sprints, but not found in them, are fetched at once
+    committed_keys = set().union(*[chart_issue_keys(chart) for chart in charts])
+    for issue in resolve_issues(committed_keys - issues.keys(), store, changelog=False):
+        issues[issue.key] = issue
+    return [SprintSnapshot(project, sprint, store, issues, chart) for sprint, chart in zip(sprints, charts)]
+
+
+def has_label(*labels):
+    labels = {label.lower() for label in labels}
+    return lambda issue: any(label.lower() in labels for label in issue.labels)
+
+
+def of_type(*issue_types):
+    issue_types = {issue_type.lower() for issue_type in issue_types}
+    return lambda issue: issue.issue_type.lower() in issue_types
+
+
+def with_priority(*priorities):
+    priorities = {priority.lower() for priority in priorities}
+    return lambda issue: issue.priority is not None and issue.priority.lower() in priorities
+
+
+def in_status_category(category: str):
+    """`category` is a status category key: 'new', 'indeterminate' or 'done'."""
+    return lambda issue: issue.status_category == category
+
+
+def resolved_between(start, end):
+    return lambda issue: issue.resolved is not None and start <= issue.resolved < end
+
+
+def summary_has_word(word: str):
+    """Approximates JQL `summary ~ word`: Jira text search matches whole words, case-insensitive."""
+    pattern = re.compile(rf"\b{re.escape(word)}\b", re.IGNORECASE)
+    return lambda issue: pattern.search(issue.summary) is not None
+
+
+def any_of(*predicates):
+    return lambda issue: any(predicate(issue) for predicate in predicates)
+
+
+def keys(issues: [JiraIssue]):
+    return {issue.key for issue in issues}
@@ -0,0 +1,47 @@
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from metrics import *
+from helpers import timedelta_formatter
+
+TIME_COLUMNS = ["LEAD_TIME_50", "LEAD_TIME_80", "LEAD_TIME_90", "CYCLE_TIME_50", "CYCLE_TIME_80", "CYCLE_TIME_90"]
+
+
+def sprint_summary(snapshot: SprintSnapshot):
+    """One trend table row: velocity, lead/cycle time percentiles and focus structure story points."""
+    velocity = velocity_issues(snapshot)
+    committed = story_points(velocity["committed"])
+    completed = story_points(velocity["completed"])
+    tables = development_time_tables(snapshot)
+    focus = focus_structure_issues(snapshot)
+    return {
+        "SPRINT": snapshot.sprint.sprint_id,
+        "NAME": snapshot.sprint.name,
+        "COMMITTED_SP": committed,
+        "COMPLETED_SP": completed,
+        "COMPLETED_%": round(completed / committed * 100, 2) if committed != 0 else None,
+        **dict(zip(TIME_COLUMNS[:3], percentiles(tables["lead time"].LEAD_TIME))),
+        **dict(zip(TIME_COLUMNS[3:], percentiles(tables["cycle time"].CYCLE_TIME))),
+        "UNPLANNED_SP": story_points(focus["unplanned"]),
+        "ROADMAP_SP": story_points(focus["roadmap"]),
+        "BUGS_SP": story_points(focus["bugs"]),
+        "TECH_DEBT_SP": story_points(focus["tech debt"]),
+        "OTHER_SP": story_points(focus["other"]),
+    }
+
+
+def sprint_trend(snapshots: [SprintSnapshot], workers=1):
+    """Trend table with a row per sprint. With `workers` > 1 sprints are computed in parallel processes."""
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            rows = list(executor.map(sprint_summary, snapshots))
+    else:
+        rows = [sprint_summary(snapshot) for snapshot in snapshots]
+    return pd.DataFrame(rows)
+
+
+def print_sprint_trend(trend):
+    printed = trend.copy()
+    for column in TIME_COLUMNS:
+        printed[column] = printed[column].map(timedelta_formatter)
+    with pd.option_context("display.max_columns", None, "display.width", None):
+        print(printed.to_string(index=False))
@@ -0,0 +1,70 @@
+import pandas as pd
+from my_jira import JiraIssue, IN_REVIEW_STATUSES, CYCLE_TIME_STATUSES, LEAD_TIME_STATUSES, ALL_STATUSES
+from profiler import PROFILER
+
+PANDAS_TIME_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+def status_transitions(issues: [JiraIssue]):
+    """All status changes of the issues as one table: ISSUE (index in `issues`), FROM, TO, TIME."""
+    rows = []
+    for i, issue in enumerate(issues):
+        if issue.status_changes is None:
+            raise ValueError(f"!!! {issue.key}: changelog wasn't fetched, can't count time in statuses")
+        for created, status_from, status_to in issue.status_changes:
+            rows.append((i, status_from, status_to, created))
+    transitions = pd.DataFrame(rows, columns=["ISSUE", "FROM", "TO", "TIME"])
+    # the same precision as JiraIssue uses: without milliseconds and time zone
+    transitions["TIME"] = pd.to_datetime(transitions.TIME.str[:-9], format=PANDAS_TIME_FORMAT)
+    return transitions
+
+
+def time_in_statuses(issues: [JiraIssue]):
+    """Time each issue spent in each status, the same as `JiraIssue.count_time_in_all_statuses` does for one issue.
+    Rows are issues (by index in `issues`), columns are statuses."""
+    transitions = status_transitions(issues)
+    created = pd.Series(pd.to_datetime([issue.created for issue in issues]))
+    # the issue was in the FROM status since the previous status change, or since it was created
+    previous_change = transitions.groupby("ISSUE").TIME.shift(1)
+    previous_change = previous_change.fillna(created.iloc[transitions.ISSUE].reset_index(drop=True))
+    transitions["DURATION"] = transitions.TIME - previous_change
+
+    unknown = ~(transitions.FROM.isin(ALL_STATUSES) & transitions.TO.isin(ALL_STATUSES))
+    if unknown.any():
+        first = transitions[unknown].iloc[0]
+        status = first.FROM if first.FROM not in ALL_STATUSES else first.TO
+        raise ValueError(f"!!! {issues[first.ISSUE].key}: was in status {status}, "
+                         f"but we missed it when count time in statuses")
+
+    return transitions.groupby(["ISSUE", "FROM"]).DURATION.sum().unstack().reindex(range(len(issues)))
+
+
+def development_times(issues: [JiraIssue]):
+    """Lead, cycle and in review time of all issues at once: KEY, TYPE, SUMMARY, LEAD_TIME, CYCLE_TIME, IN_REVIEW."""
+    with PROFILER.span("time in statuses"):
+        statuses = time_in_statuses(issues)
+
+    def total(status_list):
+        columns = [status for status in statuses.columns if status in status_list]
+        return statuses[columns].sum(axis=1, min_count=0).fillna(pd.Timedelta(0)).astype("timedelta64[ns]")
+
+    times = pd.DataFrame(
+        [(issue.key, issue.issue_type, f"{issue.summary[:20]}") for issue in issues],
+        columns=["KEY", "TYPE", "SUMMARY"]
+    )
+    times["LEAD_TIME"] = total(LEAD_TIME_STATUSES)
+    times["CYCLE_TIME"] = total(CYCLE_TIME_STATUSES)
+    times["IN_REVIEW"] = total(IN_REVIEW_STATUSES)
+    return times
+
+
+def cached_development_times(issues: [JiraIssue], cache: dict):
+    """The same as `development_times`, but times of issues found in `cache` (rows by key) aren't counted again.
+    Times of the rest are counted at once and added to the cache."""
+    missing = [issue for issue in issues if issue.key not in cache]
+    if missing:
+        for row in development_times(missing).itertuples(index=False):
+            cache[row.KEY] = row
+    if not issues:
+        return development_times(issues)
+    return pd.DataFrame([cache[issue.key] for issue in issues])
@@ -0,0 +1,22 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import my_jira
+from benchmarks.synthetic import SyntheticJira
+from benchmarks.mock_server import MockJiraServer
+
+
+@pytest.fixture
+def jira():
+    return SyntheticJira(issue_count=120, sprint_count=3)
+
+
+@pytest.fixture
+def mock(jira):
+    """The mock Jira with small pages, so a sync of the synthetic project takes several of them."""
+    with MockJiraServer(jira, page_size=20, changelog_page_size=3) as server:
+        my_jira.connect(server.url, "email", "token")
+        yield server
@@ -0,0 +1,115 @@
+import json
+from datetime import timedelta
+import pytest
+import issue_store
+from issue_store import IssueStore
+
+
+def stored(store, project="BENCH"):
+    return {issue.key: issue for issue in store.project_issues(project)}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = IssueStore(str(tmp_path / "store.sqlite"), ttl=timedelta(0))
+    yield store
+    store.connection.close()
+
+
+@pytest.fixture
+def searches(monkeypatch):
+    """JQL of every search sent by the sync."""
+    jqls = []
+    search_page = issue_store.search_page
+
+    def recording(jql, start_at, *args, **kwargs):
+        jqls.append(jql)
+        return search_page(jql, start_at, *args, **kwargs)
+    monkeypatch.setattr(issue_store, "search_page", recording)
+    return jqls
+
+
+def test_full_sync_stores_issues_with_complete_changelogs(mock, jira, store):
+    store.sync_project("BENCH")
+    issues = stored(store)
+    assert issues.keys() == jira.issues.keys()
+    # the mock returns 3 histories with a search, the rest come from the changelog API
+    key = max(jira.issues, key=lambda key: jira.issues[key]["changelog"]["total"])
+    assert jira.issues[key]["changelog"]["total"] > 3
+    raw = json.loads(store.connection.execute("SELECT raw FROM issues WHERE key = ?", (key,)).fetchone()[0])
+    assert [history["id"] for history in raw["changelog"]["histories"]] == \
+        [history["id"] for history in jira.issues[key]["changelog"]["histories"]]
+
+
+def test_incremental_sync_downloads_only_updated_issues(mock, jira, store, searches):
+    store.sync_project("BENCH")
+    key = next(key for key, issue in jira.issues.items() if issue["fields"]["status"]["name"] != "Done")
+    mock.transition(key, {"status": "Done", "time": "2030-01-01T10:00:00"})
+    searches.clear()
+
+    store.sync_project("BENCH")
+    assert len(searches) == 1 and "updated >=" in searches[0]
+    assert stored(store)[key].status_category == "done"
+    assert len(stored(store)) == len(jira.issues)
+
+
+def test_failed_sync_resumes_from_the_last_saved_page(mock, jira, store, searches, monkeypatch):
+    search_page = issue_store.search_page
+
+    def failing(jql, start_at, *args, **kwargs):
+        if len(searches) == 3:
+            raise ConnectionError("Jira is down")
+        return search_page(jql, start_at, *args, **kwargs)
+    monkeypatch.setattr(issue_store, "search_page", failing)
+    with pytest.raises(ConnectionError):
+        store.sync_project("BENCH")
+    saved = len(stored(store))
+    assert 0 < saved < len(jira.issues)
+
+    monkeypatch.setattr(issue_store, "search_page", search_page)
+    searches.clear()
+    store.sync_project("BENCH")
+    assert stored(store).keys() == jira.issues.keys()
+    # continued from the saved issues instead of the first page
+    assert "updated >=" in searches[0]
+
+
+def test_issue_updated_during_sync_does_not_shift_pages(mock, jira, store, monkeypatch):
+    search_page = issue_store.search_page
+    moved = []
+
+    def moving(jql, start_at, *args, **kwargs):
+        found = search_page(jql, start_at, *args, **kwargs)
+        if not moved:
+            # the first issue of the first page moves to the end of the order before the next page
+            moved.append(found["issues"][0]["key"])
+            mock.transition(moved[0], {"status": "Testing", "time": "2030-01-01T10:00:00"})
+        return found
+    monkeypatch.setattr(issue_store, "search_page", moving)
+
+    store.sync_project("BENCH")
+    issues = stored(store)
+    assert issues.keys() == jira.issues.keys()
+    assert issues[moved[0]].status_changes[-1][2] == "Testing"
+
+
+def test_issues_updated_in_one_minute_are_paged_by_offsets(mock, jira, store, searches, monkeypatch):
+    # e.g. a bulk edit: JQL can't tell the issues of one minute apart, so the saved ones are skipped by startAt
+    for issue in jira.issues.values():
+        issue["fields"]["updated"] = "2023-05-01T10:00:00.000+0000"
+    search_page = issue_store.search_page
+    moved = []
+
+    def moving(jql, start_at, *args, **kwargs):
+        if len(searches) == 3 and not moved:
+            # a saved issue leaves the minute, so the rest move back by one
+            moved.append("BENCH-1")
+            mock.transition(moved[0], {"status": "Testing", "time": "2030-01-01T10:00:00"})
+        return search_page(jql, start_at, *args, **kwargs)
+    monkeypatch.setattr(issue_store, "search_page", moving)
+
+    store.sync_project("BENCH")
+    assert stored(store).keys() == jira.issues.keys()
+    assert stored(store)["BENCH-1"].status_changes[-1][2] == "Testing"
+    # pages of 20 issues overlap by one, the shift costs one more search
+    assert len(searches) == 8
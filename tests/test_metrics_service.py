@@ -0,0 +1,44 @@
+import pytest
+import requests
+from metrics_service import MetricsModel, MetricsService
+
+SPRINT = 102
+
+
+def completed_count(rows):
+    return next(row["VALUE"] for row in rows if row["SECTION"] == "velocity" and row["METRIC"] == "completed_count")
+
+
+@pytest.fixture
+def service(mock):
+    with MetricsService(MetricsModel("BENCH").load()) as service:
+        mock.webhook = f"{service.url}/webhook"
+        yield service
+
+
+def test_webhook_of_transition_drops_the_sprint(mock, jira, service):
+    before = requests.get(f"{service.url}/metrics", params={"sprint": SPRINT}).json()
+    assert SPRINT in requests.get(f"{service.url}/status").json()["snapshots"]
+
+    key = next(key for key in jira.sprint_issue_keys(SPRINT)
+               if jira.issues[key]["fields"]["status"]["name"] != "Done"
+               and [sprint["id"] for sprint in jira.issues[key]["fields"]["customfield_10016"]] == [SPRINT])
+    # the mock sends the webhook to the service before it answers
+    response = requests.post(f"{mock.url}/mock/issues/{key}/transition",
+                             json={"status": "Done", "time": "2023-02-06T10:00:00"})
+    assert response.status_code == 200
+
+    status = requests.get(f"{service.url}/status").json()
+    assert status["webhooks"] == 1
+    assert SPRINT not in status["snapshots"]
+    after = requests.get(f"{service.url}/metrics", params={"sprint": SPRINT}).json()
+    assert completed_count(after) == completed_count(before) + 1
+
+
+@pytest.mark.parametrize("body", [b"{not json", b"[]", b'{"webhookEvent": "sprint_started"}',
+                                  b'{"webhookEvent": "sprint_closed", "sprint": {"id": "x"}}',
+                                  b'{"webhookEvent": "jira:issue_updated", "issue": "BENCH-1"}'])
+def test_malformed_webhook_gets_400(service, body):
+    response = requests.post(f"{service.url}/webhook", data=body, headers={"Content-Type": "application/json"})
+    assert response.status_code == 400
+    assert response.json()["error"].startswith("!!!")
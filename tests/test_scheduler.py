@@ -0,0 +1,69 @@
+import time
+import pytest
+from scheduler import RequestScheduler
+
+
+class Response:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+def responses(*items):
+    """`send` returning the items one by one, exceptions are raised."""
+    items = list(items)
+    calls = []
+
+    def send():
+        calls.append(len(calls))
+        item = items.pop(0)
+        if isinstance(item, Exception):
+            raise item
+        return item
+    send.calls = calls
+    return send
+
+
+def test_success_is_not_retried():
+    send = responses(Response(404))
+    assert RequestScheduler(4, backoff=0.001).request(send).status_code == 404
+    assert len(send.calls) == 1
+
+
+def test_server_errors_are_retried():
+    send = responses(Response(503), Response(500), Response(200))
+    assert RequestScheduler(4, backoff=0.001).request(send).status_code == 200
+    assert len(send.calls) == 3
+
+
+def test_retry_after_is_respected_and_limit_is_halved():
+    scheduler = RequestScheduler(8, backoff=10)
+    send = responses(Response(429, {"Retry-After": "0.2"}), Response(200))
+    started = time.monotonic()
+    assert scheduler.request(send).status_code == 200
+    # the backoff of 10 seconds isn't used when Jira tells when to retry
+    assert 0.2 <= time.monotonic() - started < 5
+    assert scheduler.limit == pytest.approx(4 + 1 / 4)
+
+
+def test_limit_grows_back_to_max_concurrency():
+    scheduler = RequestScheduler(2, backoff=0.001)
+    scheduler.request(responses(Response(429, {"Retry-After": "0"}), Response(200)))
+    for _ in range(10):
+        scheduler.request(responses(Response(200)))
+    assert scheduler.limit == 2
+
+
+def test_last_response_is_returned_when_retries_are_over():
+    send = responses(*[Response(503)] * 3)
+    assert RequestScheduler(4, retries=2, backoff=0.001).request(send).status_code == 503
+    assert len(send.calls) == 3
+
+
+def test_connection_errors_are_retried_and_the_last_one_raised():
+    send = responses(ConnectionError("reset"), Response(200))
+    assert RequestScheduler(4, backoff=0.001).request(send).status_code == 200
+
+    send = responses(Response(503), ConnectionError("refused"))
+    with pytest.raises(ConnectionError):
+        RequestScheduler(4, retries=1, backoff=0.001).request(send)
@@ -0,0 +1,59 @@
+import pytest
+from benchmarks.synthetic import SyntheticJira
+from my_jira import JiraSprint, get_jira_issues_by_jql, get_all_issues_from_sprint_greenhopper
+from sprint_snapshot import SprintSnapshot, keys
+from metrics import sprint_goals_issues, velocity_issues, unplanned_work_issues, focus_structure_issues, \
+    development_time_tables, unplanned
+
+
+@pytest.fixture
+def jira():
+    # enough issues for every section to have some in each sprint
+    return SyntheticJira(issue_count=400, sprint_count=3)
+
+
+@pytest.fixture(params=[100, 101, 102])
+def sprint(request, mock):
+    return JiraSprint(request.param)
+
+
+def searched(sprint: JiraSprint, jql: str):
+    """Keys of the sprint issues found by JQL of the report before the sections filtered one snapshot."""
+    return [issue.key for issue in get_jira_issues_by_jql(f"project = BENCH and sprint = {sprint.sprint_id} and {jql}")]
+
+
+def completed_jql(sprint: JiraSprint):
+    return f"resolved >= {sprint.start} and resolved < {sprint.end}"
+
+
+def key_list(issues):
+    return [issue.key for issue in issues]
+
+
+def test_sections_select_what_their_jql_found(sprint):
+    snapshot = SprintSnapshot("BENCH", sprint)
+    completed = completed_jql(sprint)
+
+    goals = sprint_goals_issues(snapshot)
+    assert key_list(goals["planned"]) == searched(sprint, "labels = sprint_goals")
+    assert key_list(goals["completed"]) == searched(sprint, f"labels = sprint_goals and {completed}")
+
+    velocity = velocity_issues(snapshot)
+    assert keys(velocity["committed"]) == keys(get_all_issues_from_sprint_greenhopper(sprint))
+    assert key_list(velocity["completed"]) == searched(sprint, completed)
+    assert key_list(unplanned_work_issues(snapshot)["completed"]) == searched(sprint, completed)
+
+    focus = focus_structure_issues(snapshot)
+    assert key_list(focus["roadmap"]) == searched(sprint, f"labels = roadmap and {completed}")
+    assert key_list(focus["tech debt"]) == searched(
+        sprint, f"(labels in (techdebt, tech_debt, tech) or summary ~ 'tech' or summary ~ 'Tech') and {completed}")
+    # the old bugs query had `resolved > start`, all sections use `resolved >= start` now
+    unplanned_keys = keys(unplanned(focus["completed"]))
+    assert key_list(focus["bugs"]) == [key for key in searched(sprint, f"type = bug and {completed}")
+                                       if key not in unplanned_keys]
+    assert all(focus[name] for name in ("roadmap", "tech debt", "bugs", "other"))
+
+    tables = development_time_tables(snapshot)
+    assert set(tables["cycle time"].KEY) == set(searched(sprint, f"{completed} and statusCategory = Done"))
+    assert set(tables["lead time"].KEY) == set(searched(
+        sprint, f"priority in (Critical,High) and type = Story and {completed} and statusCategory = Done"))
@@ -0,0 +1,40 @@
+import copy
+import pytest
+from benchmarks.synthetic import SyntheticJira
+from my_jira import JiraIssue
+from status_time import development_times
+
+COLUMNS = {"lead time": "LEAD_TIME", "cycle time": "CYCLE_TIME", "in review": "IN_REVIEW"}
+
+
+def synthetic_issues():
+    raw_issues = [copy.deepcopy(raw) for raw in SyntheticJira(issue_count=300).issues.values()]
+    # every tenth issue never changed its status: only its sprint changes are left in the changelog
+    for raw in raw_issues[::10]:
+        for history in raw["changelog"]["histories"]:
+            history["items"] = [item for item in history["items"] if item["field"] != "status"]
+    return [JiraIssue(raw) for raw in raw_issues]
+
+
+def test_development_times_are_the_same_as_for_each_issue():
+    issues = synthetic_issues()
+    assert any(not issue.status_changes for issue in issues)
+    table = development_times(issues)
+    assert list(table.KEY) == [issue.key for issue in issues]
+    for issue, row in zip(issues, table.to_dict("records")):
+        issue.count_development_time()
+        for name, column in COLUMNS.items():
+            assert row[column] == issue.development_time[name], (issue.key, name)
+
+
+def test_development_times_of_no_issues():
+    assert list(development_times([]).columns) == ["KEY", "TYPE", "SUMMARY"] + list(COLUMNS.values())
+
+
+def test_unknown_status_is_reported_like_for_one_issue():
+    issue = synthetic_issues()[1]
+    issue.status_changes[0] = (issue.status_changes[0][0], "Limbo", issue.status_changes[0][2])
+    with pytest.raises(ValueError, match="was in status Limbo"):
+        development_times([issue])
+    with pytest.raises(ValueError, match="was in status Limbo"):
+        issue.count_development_time()